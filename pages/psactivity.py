@@ -1,10 +1,16 @@
 # app.py
 import streamlit as st
-from pages.src.GradientDescent import GradientDescent
+from pages.src.GradientDescent import GradientDescent, TrajectoryDecimator, eta_options
+from pages.src.step_rules import ProximalGradient
 import random
 import numpy as np
 import time
-from pages.src.utils import assign_condition, save_prediction_and_clear_text
+from pages.src.atlas import get_atlas
+from pages.src.oracle import get_oracle
+from pages.src.custom_objectives import get_custom_objective, ExpressionError
+from pages.src.prefetch import prefetch_next_functions
+from pages.src.utils import assign_condition, save_prediction_and_clear_text, save_simulation_diagnostics
+from pages.src.activity_resources import get_trajectory_table, share_catalogue, get_prefetcher
 
 
 ###################### CONSTANTS AND UTILS ######################
@@ -26,6 +32,40 @@ if 'simulation_counter' not in st.session_state:
 if 'attempts' not in st.session_state:
     st.session_state.attempts = 0
 
+# Long-horizon mode: set to a number of steps (e.g. 10000) to stream the run progressively
+# instead of building the full animation; None keeps the usual max_iter-step animation
+if 'LONG_RUN_STEPS' not in st.session_state:
+    st.session_state.LONG_RUN_STEPS = None
+
+# Custom mountain mode: set to True to let the student type their own function f(x)
+# instead of going through the catalogue
+if 'CUSTOM_FUNCTION_MODE' not in st.session_state:
+    st.session_state.CUSTOM_FUNCTION_MODE = False
+
+# Atlas mode: set to True to show, below each simulation, the map of the outcomes of all the (a₀, η)
+# on the current function (only once the atlas has been built with python -m pages.src.atlas)
+if 'SHOW_ATLAS' not in st.session_state:
+    st.session_state.SHOW_ATLAS = False
+
+# Instructor hints: set to True to show, under the η slider, the learning rates that work best from the current a₀
+if 'SHOW_ORACLE' not in st.session_state:
+    st.session_state.SHOW_ORACLE = False
+
+# Swarm mode: set to a number of starting points (e.g. 200) to also show, after each simulation, the runs with the
+# same η from that many a₀ spread over the whole window (e.g. to see both basins of double_valley); None turns it off
+if 'SWARM_POINTS' not in st.session_state:
+    st.session_state.SWARM_POINTS = None
+
+# Resumable runs: set to a number of steps (e.g. 15) to offer, after a simulation, to continue it for that many more
+# steps from where it stopped (only the new steps are computed and only their frames are added to the figure)
+if 'CONTINUE_STEPS' not in st.session_state:
+    st.session_state.CONTINUE_STEPS = None
+
+# Non-smooth mountains: set to True to run proximal gradient steps (soft-thresholding for |x|) on the functions that
+# declare a proximal operator, instead of plain gradient steps that bounce around the kink until max_iter
+if 'PROXIMAL_STEPS' not in st.session_state:
+    st.session_state.PROXIMAL_STEPS = False
+
 TIME_LIMIT_MINUTES = 15
 ###################### STREAMLIT APP ######################
 
@@ -142,7 +182,13 @@ else:
             
             ############# USER INPUTS AND CURRENT FUNCTION #################
             
+            share_catalogue(st.session_state.X_MIN, st.session_state.X_MAX)
             GD = GradientDescent(st.session_state.X_MIN, st.session_state.X_MAX, st.session_state.simulation_counter)
+            # the next mountain is known in advance, get it ready while the student works on this one
+            prefetch_next_functions(get_prefetcher(), st.session_state.simulation_counter,
+                                    st.session_state.X_MIN, st.session_state.X_MAX,
+                                    st.session_state.ETA_MIN, st.session_state.ETA_MAX,
+                                    oracle=st.session_state.SHOW_ORACLE, atlas=st.session_state.SHOW_ATLAS)
             
             colsetup1, colsetup2 = st.columns([0.6, 0.4], vertical_alignment="center")
             
@@ -151,6 +197,18 @@ else:
                               "FR":"##### Tu es actuellement sur la montagne représentée par la fonction:", 
                               "IT":"##### Ti trovi attualmente sulla montagna rappresentata dalla funzione:"}
                 st.markdown(fct_labels[st.session_state.prefered_language])
+                if st.session_state.CUSTOM_FUNCTION_MODE:
+                    custom_labels = {"EN":"Or draw your own mountain, f(x) =", 
+                                     "FR":"Ou dessine ta propre montagne, f(x) =", 
+                                     "IT":"Oppure disegna la tua montagna, f(x) ="}
+                    custom_text = st.text_input(label=custom_labels[st.session_state.prefered_language],
+                                                placeholder="x^2 - 2cos(3x)",
+                                                key="custom_function")
+                    if custom_text:
+                        try:
+                            GD.set_objective(get_custom_objective(custom_text, st.session_state.X_MIN, st.session_state.X_MAX))
+                        except ExpressionError as error:
+                            st.warning(str(error))
                 st.latex('''f(x)=''' + GD.f_in_latex)
                 f_fig = GD.plot_naked_function()
                 st.plotly_chart(f_fig, use_container_width=True)
@@ -245,10 +303,7 @@ else:
                     # Create logarithmically spaced options
                     log_min = np.log10(st.session_state.ETA_MIN)  
                     log_max = np.log10(st.session_state.ETA_MAX)    
-                    num_steps = round(2 * (np.abs(log_min) + np.abs(log_max)) + 1)
-                    
-                    log_options = np.linspace(log_min, log_max, num_steps)
-                    options = [round(10 ** x, 4) for x in log_options]
+                    options = eta_options(st.session_state.ETA_MIN, st.session_state.ETA_MAX)
                     
                     # Find closest option to current value
                     closest_value = min(options, key=lambda x: abs(x - st.session_state.eta_value))
@@ -271,6 +326,24 @@ else:
                         st.session_state.eta_value = min(options, key=lambda x: abs(x - random_value))
                         st.rerun()
 
+                if st.session_state.SHOW_ORACLE and GD.f_idx is not None:
+                    hint = get_oracle(GD.objective.name, st.session_state.X_MIN, st.session_state.X_MAX,
+                                      st.session_state.ETA_MIN, st.session_state.ETA_MAX, GD.max_iter).query(st.session_state.init_value)
+                    if hint['fastest_eta'] is None:
+                        no_hint_labels = {"EN":f"From a₀ = {hint['a_0']}, no η of the slider reaches the goal band within the run",
+                                          "FR":f"Depuis a₀ = {hint['a_0']}, aucun η du curseur n'atteint la zone objectif pendant la simulation",
+                                          "IT":f"Da a₀ = {hint['a_0']}, nessun η del cursore raggiunge la zona obiettivo durante la simulazione"}
+                        st.caption(no_hint_labels[st.session_state.prefered_language])
+                    else:
+                        bound = f", 2/L = {hint['stable_bound']:.3g}" if hint['stable_bound'] is not None else ""
+                        hint_labels = {"EN":f"Fastest η = {hint['fastest_eta']} (goal band at iteration {hint['iterations_to_band']}), "
+                                            f"largest converging η = {hint['largest_eta']}{bound}",
+                                       "FR":f"η le plus rapide = {hint['fastest_eta']} (zone objectif à l'itération {hint['iterations_to_band']}), "
+                                            f"plus grand η qui converge = {hint['largest_eta']}{bound}",
+                                       "IT":f"η più veloce = {hint['fastest_eta']} (zona obiettivo all'iterazione {hint['iterations_to_band']}), "
+                                            f"η più grande che converge = {hint['largest_eta']}{bound}"}
+                        st.caption(hint_labels[st.session_state.prefered_language])
+
                 # Ask the student to predict what will happend given their parameters
                 prediction_labels = {"EN":"What do you think will happen?", 
                                      "FR":"Que penses-tu qu'il va se passer ?", 
@@ -328,14 +401,62 @@ else:
                 try:
                     GD.set_a_0(st.session_state.init_value)
                     GD.set_eta(st.session_state.eta_value)
-                    df_gd = GD.gradient_descent()
-                    
-                    # Display the plot
-                    gd_fig = GD.plot_iterations_and_loss()
-                    st.plotly_chart(gd_fig, use_container_width=True)
+                    if st.session_state.PROXIMAL_STEPS and GD.objective.prox is not None:
+                        GD.set_step_rule(ProximalGradient())
+                    if st.session_state.LONG_RUN_STEPS:
+                        # Render the run as it goes: the first point shows up at once, and the decimator
+                        # keeps the figure (and memory) bounded however many steps are asked for
+                        progress = st.empty()
+                        decimator = TrajectoryDecimator()
+                        for k, chunk in enumerate(GD.iterate_chunks(st.session_state.LONG_RUN_STEPS, blowup=1e6)):
+                            decimator.add(*chunk)
+                            progress.plotly_chart(GD.plot_progress(decimator), use_container_width=True, key=f"progress_{k}")
+                        # iterate kept running diagnostics of the whole run
+                        save_simulation_diagnostics(GD)
+                    else:
+                        trajectories = get_trajectory_table(st.session_state.X_MIN, st.session_state.X_MAX,
+                                                            st.session_state.ETA_MIN, st.session_state.ETA_MAX)
+                        # stop runs that are stuck at the minimum or that blow up, there is nothing left to see
+                        GD.gradient_descent(trajectories, tol=1e-6, blowup=1e6)
+                        save_simulation_diagnostics(GD)
+                        
+                        # Display the plot
+                        gd_fig = GD.plot_iterations_and_loss()
+                        st.plotly_chart(gd_fig, use_container_width=True)
+                        if st.session_state.CONTINUE_STEPS:
+                            # what "continue" needs, kept until the next simulation
+                            st.session_state.checkpoint = GD.checkpoint()
+                            st.session_state.gd_figure = gd_fig.to_dict()
+
+                        atlas = get_atlas(GD.objective.name) if st.session_state.SHOW_ATLAS and GD.f_idx is not None else None
+                        if atlas is not None:
+                            st.plotly_chart(atlas.plot_heatmap(marker=(GD.a_0, GD.eta)), use_container_width=True)
+
+                        if st.session_state.SWARM_POINTS:
+                            swarm_labels = {"EN":f"And what if {st.session_state.SWARM_POINTS} hikers started everywhere on the mountain with the same η?", 
+                                            "FR":f"Et si {st.session_state.SWARM_POINTS} randonneurs partaient de partout sur la montagne avec le même η ?", 
+                                            "IT":f"E se {st.session_state.SWARM_POINTS} escursionisti partissero da tutta la montagna con lo stesso η?"}
+                            st.markdown(swarm_labels[st.session_state.prefered_language])
+                            st.plotly_chart(GD.plot_swarm(*GD.swarm(st.session_state.SWARM_POINTS)), use_container_width=True)
                     st.session_state.simulation_counter += 1
                     #print(st.session_state.simulation_counter)
                     
                     
                 except Exception as e:
-                    st.error(f"Error: {str(e)}")
\ No newline at end of file
+                    st.error(f"Error: {str(e)}")
+
+            ############# CONTINUING THE LAST SIMULATION #################
+            if st.session_state.CONTINUE_STEPS and st.session_state.get("checkpoint") is not None:
+                continue_labels = {"EN":f"⏩ Continue for {st.session_state.CONTINUE_STEPS} more steps", 
+                                   "FR":f"⏩ Continuer pendant {st.session_state.CONTINUE_STEPS} pas de plus", 
+                                   "IT":f"⏩ Continua per altri {st.session_state.CONTINUE_STEPS} passi"}
+                if st.button(continue_labels[st.session_state.prefered_language], key="continue_run"):
+                    try:
+                        GD.resume(st.session_state.checkpoint)
+                        GD.continue_descent(st.session_state.CONTINUE_STEPS, tol=1e-6, blowup=1e6)
+                        # the diagnostics now cover the whole run, which belongs to the simulation before the counter
+                        save_simulation_diagnostics(GD, st.session_state.simulation_counter - 1)
+                        st.session_state.checkpoint = GD.checkpoint()
+                        st.plotly_chart(GD.append_frames(st.session_state.gd_figure), use_container_width=True)
+                    except Exception as e:
+                        st.error(f"Error: {str(e)}")
\ No newline at end of file
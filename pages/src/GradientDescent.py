@@ -1,57 +1,161 @@
+from functools import lru_cache
 import numpy as np
-import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import plotly.express as px
-from sympy import latex, sympify
-
-
-# CATALOGUE:
-# convex functions we define and use for the PS activity
-
-# Shifted squared
-def shifted_squared(x):
-    return x**2 + 0.5*x
-def grad_shifted_squared(x):
-    return 2*x + 0.5
-
-# Oscillating square
-def square_sin(x):
-    return x ** 2 + 0.1 * np.sin(10 * x)
-def grad_square_sin(x):
-    return 2 * x + np.cos(10 * x)
-
-# Absolute value, non-differentiable at 0
-def absolute(x):
-    return np.abs(x)
-def grad_absolute(x):
-    return np.sign(x) # fyi: np.sign(0) = 0
-
-# Double valley - polynomial function that has 2 minima
-def double_valley(x):
-    return ((x + 4) ** 4 - 15 * (x + 4) ** 3 + 80 * (x + 4) ** 2 - 180 * (x + 4) + 144) / 10
-def grad_double_valley(x):
-    return (-4 - 8 * x + 3 * x ** 2 + 4 * x ** 3) / 10
-
-#TODO: NB i am not sure using these 2 functions is a good idea, computing their loss function might be too confusing for the students
-#
-# # Cubic function: has no minima, either global nor minimum TODO: dangerous computation of its loss!!!
-# def cube(x):
-#     return x ** 3
-# def grad_cube(x):
-#     return 3 * x ** 2
-
-# # Another cubic function that has no global minimum but a local one
-# def deep_cubic(x):
-#     return x ** 3 - 4 * x
-# def grad_deep_cubic(x):
-#     return 3* x ** 2 - 4 
+from pages.src.objectives import get_objectives, get_surfaces, get_quadratic, GOAL_BAND
+from pages.src.step_rules import StepRule, run_step_rule, compare_step_rules
+from pages.src.trajectory import Trajectory, Checkpoint
+from pages.src.diagnostics import diagnose, RunningDiagnostics
+
 
 # Should we change the function every 5 simulations? Every 3 simulations?
 change_every = 3
-fs = [shifted_squared, square_sin, absolute, double_valley]#, cube, deep_cubic] 
-grads = [grad_shifted_squared, grad_square_sin, grad_absolute, grad_double_valley]#, grad_cube, grad_deep_cubic] 
-fs_latex = ["x**2 + 0.5*x", "x ** 2 + 0.1 * sin(10 * x)", "abs(x)", "((x + 4) ** 4 - 15 * (x + 4) ** 3 + 80 * (x + 4) ** 2 - 180 * (x + 4) + 144) / 10"]
+
+# Number of base figures of functions kept, see naked_figure
+NAKED_FIGURES = 64
+
+
+@lru_cache(maxsize=NAKED_FIGURES)
+def naked_figure(objective):
+    """Plot of a 1D objective alone, built once per objective (and possibly ahead of time, see prefetch)"""
+    # a plain Scatter, plotly.express would take ten times longer to build the same figure
+    fig = go.Figure(go.Scatter(x=objective.x, y=objective.y, mode="lines"))
+    fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), xaxis_title="x", yaxis_title="y")
+    return fig
+
+
+def gradient_descent_batch(f, grad_f, a0s, etas, max_iter, f_min=0.0):
+    """Run gradient descent for many (a₀, η) pairs at once.
+    a0s and etas are broadcast against each other (e.g. a0s[:, None] and etas[None, :] for a full sweep),
+    every resulting pair is one run and all runs are advanced in lockstep.
+    Returns the iterates and the losses |f(a_n) - f_min| as two (n_runs, max_iter) arrays."""
+    a0s, etas = np.broadcast_arrays(np.asarray(a0s, dtype=float), np.asarray(etas, dtype=float))
+    a0s, etas = a0s.ravel(), etas.ravel()
+
+    a_ns = np.empty((a0s.size, max_iter))
+    a_ns[:, 0] = a0s
+    # large learning rates make some runs overflow, we let them go to inf/nan silently
+    with np.errstate(over='ignore', invalid='ignore'):
+        for i in range(1, max_iter):
+            a_ns[:, i] = a_ns[:, i-1] - etas * grad_f(a_ns[:, i-1])
+        losses = np.abs(f(a_ns) - f_min)
+
+    return a_ns, losses
+
+
+def gradient_descent_batch_2d(f, grad_f, a0s, etas, max_iter, f_min=0.0):
+    """2D counterpart of gradient_descent_batch: a0s has shape (n_runs, 2) (or (2,)) and is broadcast against etas.
+    Returns the iterates as an (n_runs, max_iter, 2) array and the losses as an (n_runs, max_iter) array."""
+    a0s = np.asarray(a0s, dtype=float).reshape(-1, 2)
+    etas = np.asarray(etas, dtype=float).ravel()
+    n_runs = np.broadcast_shapes((a0s.shape[0],), etas.shape)[0]
+    a0s, etas = np.broadcast_to(a0s, (n_runs, 2)), np.broadcast_to(etas, (n_runs,))
+
+    a_ns = np.empty((n_runs, max_iter, 2))
+    a_ns[:, 0] = a0s
+    with np.errstate(over='ignore', invalid='ignore'):
+        for i in range(1, max_iter):
+            a_ns[:, i] = a_ns[:, i-1] - etas[:, None] * grad_f(a_ns[:, i-1, 0], a_ns[:, i-1, 1]).T
+        losses = np.abs(f(a_ns[..., 0], a_ns[..., 1]) - f_min)
+
+    return a_ns, losses
+
+
+def gradient_descent_batch_nd(objective, a0s, etas, max_iter, projected=True):
+    """Counterpart of gradient_descent_batch for an objectives.Quadratic: a0s has shape (n_runs, dim) (or (dim,)) and
+    is broadcast against etas. The runs are the columns of a (dim, n_runs) matrix, so each iteration costs a single
+    matrix-matrix product A @ X (one matrix-vector product for a single run).
+    Returns the iterates, as an (n_runs, max_iter, 2) array of their objective.project coordinates (or the full
+    (n_runs, max_iter, dim) iterates if projected is False), and the losses as an (n_runs, max_iter) array."""
+    a0s = np.asarray(a0s, dtype=float).reshape(-1, objective.dim)
+    etas = np.asarray(etas, dtype=float).ravel()
+    n_runs = np.broadcast_shapes((a0s.shape[0],), etas.shape)[0]
+    X = np.array(np.broadcast_to(a0s, (n_runs, objective.dim)).T)
+    etas = np.broadcast_to(etas, (n_runs,))
+    x_star = objective.true_min[:, None]
+
+    a_ns = np.empty((n_runs, max_iter, 2 if projected else objective.dim))
+    losses = np.empty((n_runs, max_iter))
+    with np.errstate(over='ignore', invalid='ignore'):
+        for i in range(max_iter):
+            gradient = objective.grad_f(X)
+            # ∇f = A(x - x*), so f(x) - f_min = ½ (x - x*)ᵀ ∇f comes for free and without cancellation
+            residual = X - x_star
+            losses[:, i] = np.abs(0.5 * np.einsum("ij,ij->j", residual, gradient))
+            a_ns[:, i] = (objective.projection.T @ residual).T if projected else X.T
+            if i < max_iter - 1:
+                X -= etas * gradient
+    return a_ns, losses
+
+
+def stopping_point(a_ns, tol=None, blowup=None):
+    """Where the early stopping rules of GradientDescent.gradient_descent would have stopped an already computed run.
+    Returns the number of iterates to keep and the stopping reason.
+    Iterates can be scalars (shape (n,)) or vectors (shape (n, d)), in which case norms are used."""
+    n_steps, reason = a_ns.shape[0], "max_iter"
+    def norm(v):
+        with np.errstate(over='ignore', invalid='ignore'):
+            return np.abs(v) if v.ndim == 1 else np.linalg.norm(v, axis=-1)
+    if blowup is not None:
+        blown = np.flatnonzero(~(norm(a_ns) <= blowup))
+        if blown.size:
+            n_steps, reason = blown[0] + np.all(np.isfinite(a_ns[blown[0]])), "diverged"
+    if tol is not None:
+        small = np.flatnonzero(norm(np.diff(a_ns[:n_steps], axis=0)) < tol)
+        if small.size:
+            n_steps, reason = small[0] + 2, "converged"
+    return int(n_steps), reason
+
+
+def eta_options(ETA_MIN, ETA_MAX):
+    """Logarithmically spaced learning rates offered by the η slider of the PS activity"""
+    log_min = np.log10(ETA_MIN)
+    log_max = np.log10(ETA_MAX)
+    num_steps = round(2 * (np.abs(log_min) + np.abs(log_max)) + 1)
+    return [round(10 ** x, 4) for x in np.linspace(log_min, log_max, num_steps)]
+
+
+def a0_options(X_MIN, X_MAX):
+    """All the starting points a student can reach in the PS activity: the Random button rounds to 0.1
+    within [X_MIN, X_MAX], and the fixed buttons (-1.5, -0.7, 0.7, 1.5) are on that same grid"""
+    return [round(k / 10, 1) for k in range(int(np.ceil(X_MIN * 10)), int(np.floor(X_MAX * 10)) + 1)]
+
+
+def simulate_trajectories(X_MIN, X_MAX, ETA_MIN, ETA_MAX, n_pts=500, max_iter=15):
+    """Simulate every (function, a₀, η) combination reachable from the PS activity in one batch per function.
+    Returns a dict {"a_ns_<function index>": array, "losses_<function index>": array} of (n_a0s * n_etas, max_iter)
+    arrays whose rows are in (a₀, η) row-major order, see trajectory_table."""
+    a0s = a0_options(X_MIN, X_MAX)
+    etas = eta_options(ETA_MIN, ETA_MAX)
+    arrays = {}
+    for f_idx in range(len(get_objectives(X_MIN, X_MAX, n_pts))):
+        GD = GradientDescent(X_MIN, X_MAX, f_idx * change_every, n_pts=n_pts, max_iter=max_iter)
+        arrays[f"a_ns_{f_idx}"], arrays[f"losses_{f_idx}"] = GD.gradient_descent_batch(np.array(a0s)[:, None], np.array(etas)[None, :])
+    return arrays
+
+
+def trajectory_table(arrays, X_MIN, X_MAX, ETA_MIN, ETA_MAX):
+    """Index the arrays of simulate_trajectories as a dict {(function index, a₀, η): (a_ns, losses)} of row views,
+    so that a simulation becomes a simple lookup"""
+    a0s = a0_options(X_MIN, X_MAX)
+    etas = eta_options(ETA_MIN, ETA_MAX)
+    trajectories = {}
+    for f_idx in range(len(arrays) // 2):
+        a_ns, losses = arrays[f"a_ns_{f_idx}"], arrays[f"losses_{f_idx}"]
+        # the table is shared by all sessions, so nobody should be able to modify it
+        a_ns.flags.writeable = False
+        losses.flags.writeable = False
+        # rows come out in (a₀, η) row-major order, matching the broadcast of simulate_trajectories
+        for row, (a_0, eta) in enumerate((a_0, eta) for a_0 in a0s for eta in etas):
+            trajectories[(f_idx, a_0, eta)] = (a_ns[row], losses[row])
+    return trajectories
+
+
+def precompute_trajectories(X_MIN, X_MAX, ETA_MIN, ETA_MAX, n_pts=500, max_iter=15):
+    """Simulate every (function, a₀, η) combination reachable from the PS activity, see trajectory_table"""
+    return trajectory_table(simulate_trajectories(X_MIN, X_MAX, ETA_MIN, ETA_MAX, n_pts, max_iter), X_MIN, X_MAX, ETA_MIN, ETA_MAX)
+
 
 class GradientDescent:
     def __init__(self, X_MIN, X_MAX, sim_counter, n_pts = 500, max_iter = 15):
@@ -62,26 +166,45 @@ class GradientDescent:
         self.n_pts = n_pts
         
         # Defining the variables we will need during the algorithm
-        self.max_iter = max_iter
-        self.a_0 = None
-        self.eta = None
-        self.df_gd = None
+        self.init_run_settings(max_iter)
     
         # User data
         self.simulation_counter = sim_counter# count how many times the user runs the simulation
 
-        # Defining the convex functions we will be working with
-        self.all_fs = fs
-        self.all_grad_fs = grads
-        self.all_fs_latex = [latex(sympify(f)) for f in fs_latex]
+        # Defining the convex functions we will be working with (shared, precomputed objectives)
+        self.all_fs = self.load_objectives(X_MIN, X_MAX, n_pts)
         # We loop over all functions to get a different one every X run of simulation (X set by change_every)
-        self.f = self.all_fs[(sim_counter // change_every) % len(self.all_fs)]
-        self.grad_f = self.all_grad_fs[(sim_counter // change_every) % len(self.all_fs)]
-        self.f_in_latex = self.all_fs_latex[(sim_counter // change_every) % len(self.all_fs_latex)]
+        self.f_idx = (sim_counter // change_every) % len(self.all_fs)
+        self.use_objective(self.all_fs[self.f_idx])
         
+
+
+    def init_run_settings(self, max_iter):
+        """Settings and results of a run, before anything is set or run (shared by the 2D and N-dimensional versions)"""
+        self.max_iter = max_iter
+        self.a_0 = None
+        self.eta = None
+        self.trajectory = None # Trajectory of the last run
+        self.diagnostics = None # summary of the last run, see diagnostics.diagnose
+        self.stop_reason = None # why the last run stopped: "max_iter", "converged", "diverged" or "max_iter_cap"
+        self.step_rule = StepRule() # how we go from a_n to a_{n+1}, plain gradient descent by default
+        self.state = None # state of the step rule after the last iterate (e.g. a velocity), to continue the run
+        self.loss_reference = "global" # which minimum the loss is measured against, see set_loss_reference
+
+
+    def load_objectives(self, X_MIN, X_MAX, n_pts):
+        """The functions the simulation counter rotates over"""
+        return get_objectives(X_MIN, X_MAX, n_pts)
+
+
+    def use_objective(self, objective):
+        """Point f, grad_f, f_in_latex and true_min to the given objective"""
+        self.objective = objective
+        self.f = objective.f
+        self.grad_f = objective.grad_f
+        self.f_in_latex = objective.latex
         # Useful variables to store for computations
-        self.true_min = None # storing the true min value of the function for computations
-        
+        self.true_min = objective.true_min # storing the true min value of the function for computations
 
 
     def set_eta(self, eta_value, verbose=False):
@@ -98,38 +221,256 @@ class GradientDescent:
             print(f"Using the initial point a₀: {self.a_0}")
 
 
-    def gradient_descent(self):
+    def set_objective(self, objective, verbose=False):
+        """Work on another objective than the catalogue function picked from the simulation counter
+        (e.g. a datasets.DataObjective). It must provide the same attributes as objectives.Objective."""
+        self.use_objective(objective)
+        self.f_idx = None # not a catalogue function, the precomputed trajectories don't apply
+        if verbose:
+            print(f"Using the objective: {objective}")
+
+
+    def set_step_rule(self, step_rule, verbose=False):
+        """Use another update rule than plain gradient descent (see step_rules: Momentum, Nesterov, Backtracking, Newton,
+        ProximalGradient and Subgradient for non-smooth functions)."""
+        self.step_rule = step_rule
+        if verbose:
+            print(f"Using the step rule: {self.step_rule.name}")
+
+
+    def set_loss_reference(self, loss_reference, verbose=False):
+        """Choose the minimum the loss |f(a_n) - f(minimum)| is measured against (and the goal band is drawn around):
+        - "global": the global minimum of f (default)
+        - "nearest": the local minimum closest to a_n, so that a run settling in any valley gets a zero loss
+        - "basin": the local minimum of the valley a₀ starts in, i.e. where plain gradient descent should end up"""
+        assert loss_reference in ("global", "nearest", "basin"), f"Unknown loss reference {loss_reference}"
+        self.loss_reference = loss_reference
+        if verbose:
+            print(f"Measuring the loss against the {self.loss_reference} minimum")
+
+
+    def gradient_descent(self, trajectories=None, tol=None, blowup=None, max_iter_cap=None):
+        """Run the algorithm from self.a_0 with learning rate self.eta.
+        If a table from precompute_trajectories is given and contains this run, it is read from there instead.
+
+        By default the algorithm runs exactly self.max_iter steps. Early stopping can be turned on with:
+        - tol: stop ("converged") once a step |a_{n+1} - a_n| is smaller than tol
+        - blowup: stop ("diverged") once |a_n| exceeds blowup or is not finite anymore
+        - max_iter_cap: runs that are still converging after max_iter steps may continue up to max_iter_cap steps
+        The reason why the run stopped is stored in self.stop_reason."""
         # Checking requirements before running the algorithm
         assert self.eta is not None, "Please use self.set_eta to define the learning rate before running the algorithm."
         assert self.a_0 is not None, "Please use self.set_a_0 to define the initial point before running the algorithm."
 
-        #initial point
+        key = (self.f_idx, self.a_0, self.eta)
+        # the precomputed table only contains plain gradient descent runs, with losses against the global minimum
+        if (trajectories is not None and key in trajectories and trajectories[key][0].size == self.max_iter
+                and max_iter_cap is None and type(self.step_rule) is StepRule and self.loss_reference == "global"):
+            a_ns, losses = trajectories[key]
+            n_steps, self.stop_reason = stopping_point(a_ns, tol, blowup)
+            with np.errstate(over='ignore', invalid='ignore'):
+                self.trajectory = Trajectory(a_ns[:n_steps], self.f(a_ns[:n_steps]), losses[:n_steps])
+            self.diagnostics = diagnose(self.trajectory, self.objective)
+            self.state = self.step_rule.init_state(self.trajectory.a_ns[-1]) # plain GD has no memory
+            return self.trajectory
+
+        extra_steps = 0 if max_iter_cap is None else max(max_iter_cap - self.max_iter, 0)
+
+        # the run starts as a one-point trajectory at a₀ that the steps are appended to
+        a_0 = np.array([self.a_0], dtype=float)
+        with np.errstate(over='ignore', invalid='ignore'):
+            self.trajectory = Trajectory(a_0, self.f(a_0), self.compute_loss(a_0))
+        self.state = self.step_rule.init_state(self.a_0)
+        return self.extend_run(self.max_iter - 1, tol, blowup, extra_steps)
+
+
+    def checkpoint(self):
+        """Snapshot of the last run (see trajectory.Checkpoint), to be continued later by another GradientDescent"""
+        assert self.trajectory is not None, "Please run the algorithm before saving a checkpoint."
+        return Checkpoint(self.objective, self.f_idx, self.a_0, self.eta, self.step_rule, self.loss_reference,
+                          self.trajectory, self.state, self.stop_reason)
+
+
+    def resume(self, checkpoint):
+        """Go back to the run saved in a checkpoint, on its function and with its settings"""
+        self.use_objective(checkpoint.objective)
+        self.f_idx = checkpoint.f_idx
+        self.a_0, self.eta = checkpoint.a_0, checkpoint.eta
+        self.step_rule, self.loss_reference = checkpoint.step_rule, checkpoint.loss_reference
+        self.trajectory, self.state, self.stop_reason = checkpoint.trajectory, checkpoint.state, checkpoint.stop_reason
+        self.diagnostics = diagnose(self.trajectory, self.objective)
+
+
+    def continue_descent(self, n_steps, tol=None, blowup=None):
+        """Run n_steps more steps of the last run (e.g. after resume), from its last iterate and step rule state.
+        Only the new steps are computed and they are appended to self.trajectory (see Trajectory.extend).
+        tol and blowup work as in gradient_descent; a run that diverged is left as it is."""
+        assert self.trajectory is not None, "Please run the algorithm (or resume a checkpoint) before continuing it."
+        assert self.trajectory.a_ns.ndim == 1, "Only runs on functions of one variable can be continued."
+        if self.stop_reason == "diverged":
+            return self.trajectory
+        return self.extend_run(n_steps, tol, blowup)
+
+
+    def extend_run(self, n_steps, tol=None, blowup=None, extra_steps=0):
+        """Append the steps of self.steps from the end of self.trajectory and diagnose the whole run
+        (shared by gradient_descent and continue_descent)"""
+        a_ns = list(self.steps(float(self.trajectory.a_ns[-1]), self.state, n_steps, tol, blowup, extra_steps))
+        # a run that blew up still shows its last point if it can be drawn
+        if self.stop_reason == "diverged" and not np.isfinite(a_ns[-1]):
+            a_ns.pop()
+        a_ns = np.array(a_ns, dtype=float)
+        with np.errstate(over='ignore', invalid='ignore'):
+            self.trajectory = self.trajectory.extend(a_ns, self.f(a_ns), self.compute_loss(a_ns))
+            self.diagnostics = diagnose(self.trajectory, self.objective)
+        return self.trajectory
+
+
+    def steps(self, a_n, state, n_steps=None, tol=None, blowup=None, extra_steps=0):
+        """The stepping loop of every 1D run: lazily yield the iterates that follow a_n (whose step rule state is
+        state), n_steps of them (or forever if None). Then up to extra_steps more, only while the steps keep
+        shrinking. It stops ("diverged") after yielding an iterate with |a_n| > blowup, or ("converged") after a step
+        smaller than tol. self.stop_reason and self.state are kept up to date as it goes."""
+        self.stop_reason = "max_iter"
+        last_step = previous_step = None
+        n = 0
+        with np.errstate(over='ignore', invalid='ignore'):
+            while n_steps is None or n < n_steps + extra_steps:
+                # past n_steps we only keep going while the steps keep shrinking
+                if n_steps is not None and n >= n_steps and not (previous_step is not None and last_step < previous_step):
+                    return
+                a_n_1, state, _ = self.step_rule.step(self.objective, a_n, self.eta, state)
+                a_n_1 = float(a_n_1)
+                self.state = state
+                n += 1
+                yield a_n_1
+                if blowup is not None and not abs(a_n_1) <= blowup:
+                    self.stop_reason = "diverged"
+                    return
+                previous_step, last_step = last_step, abs(a_n_1 - a_n)
+                if tol is not None and last_step < tol:
+                    self.stop_reason = "converged"
+                    return
+                a_n = a_n_1
+        if extra_steps:
+            self.stop_reason = "max_iter_cap"
+
+
+    def stochastic_gradient_descent(self, batch_size=None, n_epochs=None, seed=0):
+        """Gradient descent on a data objective (see set_objective and datasets.DataObjective), streaming over its file:
+        - batch_size=None: full-batch gradient descent, one step per epoch
+        - batch_size=k: mini-batch SGD, one step per batch of k consecutive rows, batches visited in random order
+        - batch_size=1: stochastic gradient descent, one step per sample
+        Only one batch is read from the memory-mapped file at a time. self.trajectory gets one entry per epoch
+        (iteration 0 being a₀) with the full-batch loss, so that plot_iterations_and_loss shows per-epoch curves."""
+        assert self.eta is not None, "Please use self.set_eta to define the learning rate before running the algorithm."
+        assert self.a_0 is not None, "Please use self.set_a_0 to define the initial point before running the algorithm."
+        assert hasattr(self.objective, "batch_grad"), "Please use self.set_objective with a data objective first."
+
+        data = self.objective.data
+        n_epochs = self.max_iter - 1 if n_epochs is None else n_epochs
+        rng = np.random.default_rng(seed)
+        if batch_size is not None:
+            batch_starts = np.arange(0, data.shape[0], batch_size)
+
         a_n = self.a_0
-        #list of all th a_ns
-        a_ns = np.zeros(self.max_iter)
-        a_ns[0] = self.a_0
-        #list of corresponding losses
-        losses = np.zeros(self.max_iter)
-        losses[0] = self.compute_loss(self.a_0)
-        
-        #perform the algorithm
-        for i in range(1, self.max_iter):
-            a_n_1 =  a_n - self.eta * self.grad_f(a_n) 
-            a_ns[i] = a_n_1
-            losses[i] = self.compute_loss(a_n_1)
-            a_n = a_n_1
-        
-        # Storing the steps of the algorithm into a dataframe
-        self.df_gd = pd.DataFrame({'a_ns': a_ns, 'f_a_ns': self.f(a_ns), 'losses': losses, 'iteration': np.arange(self.max_iter)})
-        
-        return self.df_gd
+        a_ns = [a_n]
+        self.stop_reason = "max_iter"
+        with np.errstate(over='ignore', invalid='ignore'):
+            for epoch in range(n_epochs):
+                if batch_size is None:
+                    # the full-batch gradient streams over the file (or uses its moments), never loading it whole
+                    a_n = a_n - self.eta * self.objective.grad_f(a_n)
+                else:
+                    for start in rng.permutation(batch_starts):
+                        a_n = a_n - self.eta * self.objective.batch_grad(a_n, data[start:start + batch_size])
+                if not np.isfinite(a_n):
+                    self.stop_reason = "diverged"
+                    break
+                a_ns.append(float(a_n))
+            a_ns = np.array(a_ns)
+            # full-batch loss of every epoch in a single pass over the file
+            f_a_ns = self.f(a_ns)
+            self.trajectory = Trajectory(a_ns, f_a_ns, np.abs(f_a_ns - self.objective.f_min))
+            self.diagnostics = diagnose(self.trajectory, self.objective)
+        self.state = None # continued runs take full-batch steps
+        return self.trajectory
+
+
+    def iterate(self, n_steps=None, blowup=None):
+        """Lazily yield (n, a_n, loss of a_n), starting with a₀, for n_steps steps (or forever if None).
+        Nothing is stored, so arbitrarily long runs cost constant memory. With blowup, the generator stops
+        (and sets self.stop_reason to "diverged") after the first iterate with |a_n| > blowup.
+        Once the generator is exhausted (or closed), self.diagnostics summarizes the iterates it yielded."""
+        assert self.eta is not None, "Please use self.set_eta to define the learning rate before running the algorithm."
+        assert self.a_0 is not None, "Please use self.set_a_0 to define the initial point before running the algorithm."
+        assert np.ndim(self.a_0) == 0, "Only runs on functions of one variable can be iterated."
+
+        self.stop_reason = "max_iter"
+        running = RunningDiagnostics()
+        try:
+            with np.errstate(over='ignore', invalid='ignore'):
+                loss = self.compute_loss(self.a_0)
+                running.add(self.a_0, loss)
+                yield 0, self.a_0, loss
+                for n, a_n in enumerate(self.steps(self.a_0, self.step_rule.init_state(self.a_0), n_steps, blowup=blowup), 1):
+                    loss = self.compute_loss(a_n)
+                    running.add(a_n, loss)
+                    yield n, a_n, loss
+        finally:
+            self.diagnostics = running.record(self.objective)
+
+
+    def iterate_chunks(self, n_steps=None, max_chunk=1024, blowup=None):
+        """Group self.iterate into (iterations, a_ns, losses) arrays. The first chunk only holds a₀ and chunks then
+        double in size up to max_chunk, so that the first point can be shown immediately and long runs still
+        arrive in few, large pieces."""
+        chunk_size = 1
+        iterations, a_ns, losses = [], [], []
+        for n, a_n, loss in self.iterate(n_steps, blowup):
+            iterations.append(n)
+            a_ns.append(a_n)
+            losses.append(loss)
+            if len(iterations) == chunk_size:
+                yield np.array(iterations), np.array(a_ns), np.array(losses)
+                iterations, a_ns, losses = [], [], []
+                chunk_size = min(2 * chunk_size, max_chunk)
+        if iterations:
+            yield np.array(iterations), np.array(a_ns), np.array(losses)
+
+
+    def gradient_descent_batch(self, a0s, etas):
+        """Vectorized version of self.gradient_descent for many starting points and learning rates,
+        see the module level gradient_descent_batch. Returns (n_runs, max_iter) arrays of iterates and losses."""
+        if type(self.step_rule) is not StepRule:
+            a_ns, losses = run_step_rule(self.objective, self.step_rule, a0s, etas, self.max_iter)[:2]
+        else:
+            a_ns, losses = gradient_descent_batch(self.f, self.grad_f, a0s, etas, self.max_iter, self.f(self.true_min))
+        if self.loss_reference != "global":
+            with np.errstate(over='ignore', invalid='ignore'):
+                losses = self.compute_loss(a_ns, a_ns[:, :1])
+        return a_ns, losses
+
+
+    def swarm(self, n_points=200):
+        """Run the algorithm with learning rate self.eta from n_points starting points evenly spread over
+        [X_MIN, X_MAX], all in one vectorized run (see gradient_descent_batch).
+        Returns the iterates and the losses as two (n_points, max_iter) arrays."""
+        assert self.eta is not None, "Please use self.set_eta to define the learning rate before running the algorithm."
+        return self.gradient_descent_batch(np.linspace(self.X_MIN, self.X_MAX, n_points), self.eta)
+
+
+    def compare_step_rules(self, step_rules=None):
+        """Run all step rules (or the given ones) from self.a_0 with self.eta on the current function and report,
+        for each of them, after how many iterations and function evaluations the loss enters the goal band."""
+        assert self.eta is not None, "Please use self.set_eta to define the learning rate before comparing step rules."
+        assert self.a_0 is not None, "Please use self.set_a_0 to define the initial point before comparing step rules."
+        assert np.ndim(self.a_0) == 0, "Step rules can only be compared on functions of one variable."
+        return compare_step_rules(self.objective, self.a_0, self.eta, self.max_iter, step_rules)
 
 
     def find_min_f(self):
-        # 1D for now but should be 2D later on
-        x = np.linspace(self.X_MIN, self.X_MAX, self.n_pts)
-        true_min = x[np.argmin(self.f(x))]
-        return true_min # returns the x of the actual minimum, not f(x)
+        return self.objective.true_min # returns the x of the actual minimum, not f(x)
     
     
     def set_true_min(self, verbose=False):
@@ -138,20 +479,31 @@ class GradientDescent:
             print(f"The actual minimum of f is at x = {self.true_min:.2f} with f(x) = {self.f(self.true_min):.2f}")
     
     
-    def compute_loss(self, x):
-        if self.true_min is None:
-            self.set_true_min()
-        return abs(self.f(x) - self.f(self.true_min))
+    def reference_minimum(self, x, a_0=None):
+        """x of the minimum the loss of x is measured against (see set_loss_reference), in O(log k) through the
+        objective's stationary-point index. a_0 defaults to self.a_0 and only matters for "basin"."""
+        if self.loss_reference == "nearest":
+            return self.objective.nearest_minimum(x)
+        if self.loss_reference == "basin":
+            return self.objective.basin_minimum(self.a_0 if a_0 is None else a_0)
+        return self.true_min
+
+
+    def goal_minimum(self):
+        """(x, f(x)) of the minimum the goal band is drawn around: the reference minimum of the last iterate"""
+        a = self.trajectory.a_ns[-1] if self.trajectory is not None else self.a_0
+        x_ref = float(self.reference_minimum(a))
+        return x_ref, float(self.f(x_ref))
+
+
+    def compute_loss(self, x, a_0=None):
+        return abs(self.f(x) - self.f(self.reference_minimum(x, a_0)))
     
 
     def plot_naked_function(self):
-        """Plot the shape of the current function to give insight on what the fucntion looks like"""
-
-        x = np.linspace(self.X_MIN, self.X_MAX, self.n_pts)
-        fig = px.line(x=x, y=self.f(x))
-        fig.update_layout(margin=dict(l=0, r=0, t=0, b=0))
-        
-        return fig
+        """Plot the shape of the current function to give insight on what the fucntion looks like.
+        The figure is cached and shared by every session (see naked_figure): draw it, don't modify it."""
+        return naked_figure(self.objective)
 
 
     def plot_iterations_and_loss(self):
@@ -162,20 +514,21 @@ class GradientDescent:
 
         # ===== Left subplot: f(x) + GD path =====
         
-        x = np.linspace(self.X_MIN, self.X_MAX, self.n_pts)
+        x = self.objective.x
+        goal_x, goal_f = self.goal_minimum()
         fig.add_trace(
-            go.Scatter(x=x, y=self.f(x), mode="lines", name="f(x)", line=dict(color="lightgray")),
+            go.Scatter(x=x, y=self.objective.y, mode="lines", name="f(x)", line=dict(color="lightgray")),
             row=1, col=1
         )
         
-        # Green goal area around f(true_min)
+        # Green goal area around f(true_min), flat so its two ends are enough
         for fill_y, fill_opt in [
-            ([self.f(self.true_min) + 0.05] * self.n_pts, None),
-            ([self.f(self.true_min) - 0.05] * self.n_pts, 'tonexty')
+            ([goal_f + GOAL_BAND] * 2, None),
+            ([goal_f - GOAL_BAND] * 2, 'tonexty')
         ]:
             fig.add_trace(
                 go.Scatter(
-                    x=x, y=fill_y,
+                    x=[x[0], x[-1]], y=fill_y,
                     fill=fill_opt,
                     mode='lines',
                     line=dict(width=0),
@@ -189,7 +542,7 @@ class GradientDescent:
         # Circle around true minimum
         fig.add_trace(
             go.Scatter(
-                x=[self.true_min], y=[self.f(self.true_min)],
+                x=[goal_x], y=[goal_f],
                 mode='markers',
                 marker=dict(size=7, color='rgba(144, 238, 144, 0.5)',
                             line=dict(color='lightgreen', width=2)),
@@ -198,12 +551,15 @@ class GradientDescent:
             row=1, col=1
         )
         
-        # GD initial point
+        # GD initial point, the labels a0, a1, ... are the text of the points
         fig.add_trace(
             go.Scatter(
-                x=[self.df_gd['a_ns'].iloc[0]],
-                y=[self.df_gd['f_a_ns'].iloc[0]],
-                mode="markers",
+                x=self.trajectory.a_ns[:1],
+                y=self.trajectory.f_a_ns[:1],
+                text=["a0"],
+                mode="markers+text",
+                textposition="top right",
+                textfont=dict(size=12, color="darkred"),
                 marker=dict(color="red", size=7),
                 name="GD Path"
             ),
@@ -222,10 +578,10 @@ class GradientDescent:
         )
 
         # Green goal band for loss
-        for fill_y, fill_opt in [([0.05, 0.05], None), ([0, 0], 'tonexty')]:
+        for fill_y, fill_opt in [([GOAL_BAND, GOAL_BAND], None), ([0, 0], 'tonexty')]:
             fig.add_trace(
                 go.Scatter(
-                    x=[self.df_gd['iteration'].min() - 1, self.df_gd['iteration'].max() + 1],
+                    x=[-1, len(self.trajectory)],
                     y=fill_y,
                     fill=fill_opt,
                     mode='lines',
@@ -238,94 +594,154 @@ class GradientDescent:
             )
 
         # ===== Frames =====
-        frames = []
-        xshift, yshift = 20, 10  # fixed offset for all labels
-
-        for i in self.df_gd['iteration'].unique():
-            data_up_to_i = self.df_gd[self.df_gd['iteration'] <= i]
-
-            # Only show labels for visible points
-            annotations = [
-                dict(
-                    x=row['a_ns'],
-                    y=row['f_a_ns'],
-                    text=f"a{int(row['iteration'])}",
-                    showarrow=False,
-                    xshift=xshift,
-                    yshift=yshift,
-                    font=dict(size=12, color="darkred"),
-                    xref='x', yref='y'
-                )
-                for _, row in data_up_to_i.iterrows()
-            ]
-
-            frames.append(
-                go.Frame(
-                    data=[
-                        # Left plot traces
-                        go.Scatter(x=x, y=self.f(x)),  # f(x)
-                        go.Scatter(x=x, y=[self.f(self.true_min) + 0.05]*self.n_pts),
-                        go.Scatter(x=x, y=[self.f(self.true_min) - 0.05]*self.n_pts),
-                        go.Scatter(x=[self.true_min], y=[self.f(self.true_min)]),
-                        go.Scatter(
-                            x=data_up_to_i['a_ns'],
-                            y=data_up_to_i['f_a_ns'],
-                            mode="markers",
-                            marker=dict(color="red", size=7)
-                        ),
-                        # Right plot traces
-                        go.Scatter(
-                            x=data_up_to_i['iteration'],
-                            y=data_up_to_i['losses'],
-                            mode="markers+lines",
-                            marker=dict(color="red", size=7)
-                        ),
-                        go.Scatter(x=[self.df_gd['iteration'].min() - 1, self.df_gd['iteration'].max() + 1], y=[0.05, 0.05]),
-                        go.Scatter(x=[self.df_gd['iteration'].min() - 1, self.df_gd['iteration'].max() + 1], y=[0, 0])
-                    ],
-                    layout=go.Layout(annotations=annotations),
-                    name=str(i)
-                )
-            )
-
-        fig.frames = frames
+        fig.frames = [self.iteration_frame(i) for i in self.trajectory.iterations]
+        updatemenus, sliders = animation_controls([str(i) for i in self.trajectory.iterations])
 
         # ===== Layout =====
         fig.update_layout(
             height=700,
             xaxis=dict(range=[self.X_MIN - 0.2, self.X_MAX + 0.2], title="x"),
-            yaxis=dict(range=[min(self.f(x)) - 0.3, max(self.f(x)) + 0.3], title="f(x)"),
-            xaxis2=dict(range=[-1, self.max_iter], title="Iteration"),
-            yaxis2=dict(range=[-0.1, max(self.df_gd['losses']) + 0.1], title="Loss"),
+            yaxis=dict(range=[self.objective.y_min - 0.3, self.objective.y_max + 0.3], title="f(x)"),
+            xaxis2=dict(range=[-1, max(self.max_iter, len(self.trajectory))], title="Iteration"),
+            yaxis2=dict(range=[-0.1, self.trajectory.max_finite_loss() + 0.1], title="Loss"),
             showlegend=False,
-            updatemenus=[{
-                'type': 'buttons',
-                'showactive': False,
-                'buttons': [
-                    {'label': 'Play', 'method': 'animate',
-                    'args': [None, {'frame': {'duration': 600, 'redraw': True},
-                                    'fromcurrent': True, 'transition': {'duration': 200}}]},
-                    {'label': 'Pause', 'method': 'animate',
-                    'args': [[None], {'frame': {'duration': 0, 'redraw': False},
-                                    'mode': 'immediate', 'transition': {'duration': 0}}]}
-                ]
-            }],
-            sliders=[{
-                'steps': [
-                    {'args': [[str(i)], {'frame': {'duration': 0, 'redraw': True}, 'mode': 'immediate'}],
-                    'label': str(i), 'method': 'animate'}
-                    for i in self.df_gd['iteration'].unique()
-                ],
-                'transition': {'duration': 200},
-                'x': 0,
-                'y': -0.2,
-                'currentvalue': {'prefix': 'Iteration: '}
-            }]
+            updatemenus=updatemenus,
+            sliders=sliders,
         )
 
         return fig
 
 
+    def iteration_frame(self, i):
+        """Frame i of plot_iterations_and_loss: the iterates a_0, ..., a_i with their labels (traces 4) and their losses
+        (trace 5). The curve and the goal bands never change, so frames leave them out and they are sent only once."""
+        data_up_to_i = self.trajectory.prefix(i + 1)
+        return go.Frame(
+            data=[
+                go.Scatter(x=data_up_to_i.a_ns, y=data_up_to_i.f_a_ns, text=[f"a{n}" for n in range(i + 1)]),
+                go.Scatter(x=data_up_to_i.iterations, y=data_up_to_i.losses),
+            ],
+            traces=[4, 5],
+            name=str(i)
+        )
+
+
+    def append_frames(self, fig):
+        """Bring a figure of plot_iterations_and_loss up to date with a continued run (see continue_descent).
+        fig is the figure as a dict (fig.to_dict(), which st.plotly_chart accepts as well), so that the frames already
+        there are kept as they are: only the frames of the new iterations are built."""
+        n_frames, n_iterations = len(fig["frames"]), len(self.trajectory)
+        # the loss goal band follows the longer x axis (frames don't carry it)
+        fig["data"][6]["x"] = fig["data"][7]["x"] = [-1, n_iterations]
+        fig["frames"].extend(self.iteration_frame(i).to_plotly_json() for i in range(n_frames, n_iterations))
+
+        _, sliders = animation_controls([str(i) for i in range(n_iterations)])
+        fig["layout"]["sliders"] = sliders
+        fig["layout"]["xaxis2"]["range"] = [-1, max(self.max_iter, n_iterations)]
+        fig["layout"]["yaxis2"]["range"] = [-0.1, self.trajectory.max_finite_loss() + 0.1]
+        return fig
+
+
+
+    def plot_progress(self, decimator):
+        """Static (non-animated) view of a long run being streamed: f(x) with the iterates kept by a TrajectoryDecimator
+        and the loss curve, the last iterate being highlighted. Its size only depends on the decimator's max_points."""
+        fig = make_subplots(rows=1, cols=2, subplot_titles=("Gradient Descent Path", "Loss Curve"))
+        iterations, a_ns, losses = decimator.arrays()
+        with np.errstate(over='ignore', invalid='ignore'):
+            f_a_ns = self.f(a_ns)
+
+        fig.add_trace(go.Scatter(x=self.objective.x, y=self.objective.y, mode="lines", line=dict(color="lightgray")), row=1, col=1)
+        goal_f = self.f(self.reference_minimum(a_ns[-1]))
+        for fill_y, fill_opt in [(goal_f + GOAL_BAND, None), (goal_f - GOAL_BAND, 'tonexty')]:
+            fig.add_trace(go.Scatter(x=[self.X_MIN, self.X_MAX], y=[fill_y, fill_y], fill=fill_opt, mode='lines', line=dict(width=0),
+                                     fillcolor='rgba(144, 238, 144, 0.3)' if fill_opt else None, hoverinfo='skip'), row=1, col=1)
+        fig.add_trace(go.Scatter(x=a_ns, y=f_a_ns, mode="markers", marker=dict(color="rgba(255, 0, 0, 0.3)", size=6)), row=1, col=1)
+        fig.add_trace(go.Scatter(x=a_ns[-1:], y=f_a_ns[-1:], mode="markers+text", text=[f"a{iterations[-1]}"],
+                                 textposition="top right", marker=dict(color="red", size=9)), row=1, col=1)
+        fig.add_trace(go.Scatter(x=iterations, y=losses, mode="lines", line=dict(color="red")), row=1, col=2)
+
+        fig.update_layout(
+            height=700,
+            xaxis=dict(range=[self.X_MIN - 0.2, self.X_MAX + 0.2], title="x"),
+            yaxis=dict(range=[self.objective.y_min - 0.3, self.objective.y_max + 0.3], title="f(x)"),
+            xaxis2=dict(title="Iteration"),
+            yaxis2=dict(title="Loss", type="log"),
+            showlegend=False,
+        )
+        return fig
+
+
+    def plot_swarm(self, a_ns, losses):
+        """Animation of many runs at once (see self.swarm): all the iterates of an iteration are a single marker trace,
+        colored by the basin the run ends in (gray if it diverged), and the loss plot shows the share of the runs
+        inside the goal band. A frame only carries the positions of the points, so the figure grows with the number
+        of points and not with a number of traces or annotations."""
+        with np.errstate(over='ignore', invalid='ignore'):
+            f_a_ns = self.f(a_ns)
+            visible = np.isfinite(a_ns) & np.isfinite(f_a_ns)
+        # hidden points stay in the trace as NaN, so that every point keeps its color from frame to frame
+        # (float32 is plenty for a plot and halves the size of the frames)
+        xs = np.where(visible, a_ns, np.nan).astype(np.float32)
+        ys = np.where(visible, f_a_ns, np.nan).astype(np.float32)
+
+        # basin of the last iterate, one color per local minimum
+        finite = np.isfinite(a_ns[:, -1])
+        basins = np.minimum(np.searchsorted(self.objective.maxima, np.where(finite, a_ns[:, -1], 0)),
+                            self.objective.minima.size - 1)
+        palette = px.colors.qualitative.Plotly
+        colors = np.where(finite, np.array(palette)[basins % len(palette)], "lightgray")
+
+        background = [
+            go.Scatter(x=self.objective.x, y=self.objective.y, mode="lines", line=dict(color="lightgray"), hoverinfo='skip'),
+            go.Scatter(x=self.objective.minima, y=self.objective.f_minima, mode='markers', hoverinfo='skip',
+                       marker=dict(size=9, color='rgba(144, 238, 144, 0.5)', line=dict(color='lightgreen', width=2))),
+        ]
+        return self.swarm_figure(background, xs, ys, colors, losses,
+                                 xaxis=dict(range=[self.X_MIN - 0.2, self.X_MAX + 0.2], title="x"),
+                                 yaxis=dict(range=[self.objective.y_min - 0.3, self.objective.y_max + 0.3], title="f(x)"))
+
+
+    def swarm_figure(self, background, xs, ys, colors, losses, **axes):
+        """The figure of plot_swarm in any dimension: two background traces and the swarm (points (xs[:, i], ys[:, i])
+        at iteration i) on the left, the share of the runs inside the goal band on the right. axes are the layout of
+        the left subplot."""
+        fig = make_subplots(rows=1, cols=2, subplot_titles=("Gradient Descent Swarm", "Runs in the goal band"))
+        iterations = np.arange(xs.shape[1])
+        in_band = np.mean(losses <= GOAL_BAND, axis=0)
+
+        # ===== Left subplot: background (traces 0 and 1) and the swarm =====
+        fig.add_traces(background, rows=1, cols=1)
+        fig.add_trace(go.Scatter(x=xs[:, 0], y=ys[:, 0], mode="markers", marker=dict(color=colors, size=6, opacity=0.7),
+                                 hoverinfo='skip'), row=1, col=1)  # trace 2
+
+        # ===== Right subplot: share of runs in the goal band =====
+        fig.add_trace(go.Scatter(x=iterations[:1], y=in_band[:1], mode="markers+lines",
+                                 marker=dict(color="red", size=7), line=dict(color="red")), row=1, col=2)  # trace 3
+
+        # ===== Frames: only the swarm and the share change =====
+        fig.frames = [
+            go.Frame(
+                data=[go.Scatter(x=xs[:, i], y=ys[:, i]),
+                      go.Scatter(x=iterations[:i + 1], y=in_band[:i + 1])],
+                traces=[2, 3],
+                name=str(i)
+            )
+            for i in iterations
+        ]
+
+        updatemenus, sliders = animation_controls([str(i) for i in iterations])
+        fig.update_layout(
+            height=700,
+            **axes,
+            xaxis2=dict(range=[-1, xs.shape[1]], title="Iteration"),
+            yaxis2=dict(range=[-0.05, 1.05], title="Share of runs", tickformat=".0%"),
+            showlegend=False,
+            updatemenus=updatemenus,
+            sliders=sliders,
+        )
+        return fig
+
 
     def plot_loss(self):
         # Create base figure
@@ -344,14 +760,14 @@ class GradientDescent:
 
         # Create frames for animation
         frames = []
-        for i in self.df_gd['iteration'].unique():
+        for i in self.trajectory.iterations:
             frames.append(
                 go.Frame(
                     data=[
                         # leave line untouched → only scatter trace (2nd trace, index 1)
                         go.Scatter(
-                            x=self.df_gd.loc[self.df_gd['iteration'] <= i, 'iteration'],
-                            y=self.df_gd.loc[self.df_gd['iteration'] <= i, 'losses'],
+                            x=self.trajectory.iterations[:i + 1],
+                            y=self.trajectory.losses[:i + 1],
                             mode="markers+lines",
                             marker=dict(color='red', size=7)
                         )
@@ -365,8 +781,8 @@ class GradientDescent:
         # Add animation controls
         fig.update_layout(
             height = 700,
-            xaxis_range=[-1, self.max_iter],
-            yaxis_range=[-0.1, max(self.df_gd.losses) + 0.1],
+            xaxis_range=[-1, max(self.max_iter, len(self.trajectory))],
+            yaxis_range=[-0.1, self.trajectory.max_finite_loss() + 0.1],
             title='Gradient Descent Loss',
             showlegend=True,
             updatemenus=[{
@@ -401,7 +817,7 @@ class GradientDescent:
                         'label': str(i),
                         'method': 'animate'
                     }
-                    for i in self.df_gd['iteration'].unique()
+                    for i in self.trajectory.iterations
                 ],
                 'transition': {'duration': 200},
                 'x': 0,
@@ -410,20 +826,20 @@ class GradientDescent:
             }]
         )
 
-        fig.show()
+        return fig
 
 
     def plot_iterations(self):
 
         # Create base figure with the function line
-        x = np.linspace(self.X_MIN, self.X_MAX, self.n_pts)
+        x = self.objective.x
         fig = go.Figure()
 
         # Add the function line (will stay static in background)
         fig.add_trace(
             go.Scatter(
                 x=x,
-                y=self.f(x),
+                y=self.objective.y,
                 mode='lines',
                 name='f(x)',
                 line=dict(color='lightgray'),
@@ -433,8 +849,8 @@ class GradientDescent:
         # Add the animated scatter points
         fig.add_trace(
             go.Scatter(
-                x=[self.df_gd['a_ns'][0]],
-                y=[self.df_gd['f_a_ns'][0]],
+                x=self.trajectory.a_ns[:1],
+                y=self.trajectory.f_a_ns[:1],
                 mode='markers',
                 name='Gradient Descent',
                 marker=dict(
@@ -477,7 +893,7 @@ class GradientDescent:
                         'label': str(i),
                         'method': 'animate'
                     }
-                    for i in self.df_gd['iteration'].unique()
+                    for i in self.trajectory.iterations
                 ],
                 'transition': {'duration': 200},
                 'x': 0,
@@ -491,16 +907,16 @@ class GradientDescent:
             go.Frame(
                 data=[
                     # Keep the line trace unchanged
-                    go.Scatter(x=x, y=self.f(x)),
+                    go.Scatter(x=x, y=self.objective.y),
                     # Update only the scatter points
                     go.Scatter(
-                        x=self.df_gd[self.df_gd['iteration'] <= i]['a_ns'],
-                        y=self.df_gd[self.df_gd['iteration'] <= i]['f_a_ns']
+                        x=self.trajectory.a_ns[:i + 1],
+                        y=self.trajectory.f_a_ns[:i + 1]
                     )
                 ],
                 name=str(i)
             )
-            for i in self.df_gd['iteration'].unique()
+            for i in self.trajectory.iterations
         ]
 
         fig.frames = frames
@@ -510,9 +926,407 @@ class GradientDescent:
             height = 700,
             #width = 800,
             xaxis_range=[self.X_MIN, self.X_MAX],
-            yaxis_range=[min(self.f(x)), max(self.f(x))],
+            yaxis_range=[self.objective.y_min, self.objective.y_max],
             title='Gradient Descent Animation',
             showlegend=True
         )
 
-        fig.show()
\ No newline at end of file
+        return fig
+
+
+
+class TrajectoryDecimator:
+    """Keeps a bounded, evenly spaced subset of an arbitrarily long stream of iterates for display.
+    Points are kept every `stride` iterations; whenever more than max_points are stored, every other point is
+    dropped and the stride doubles. The most recent iterate is always kept."""
+    def __init__(self, max_points=500):
+        self.max_points = max_points
+        self.stride = 1
+        self.iterations, self.a_ns, self.losses = [], [], []
+        self.last = None
+
+    def add(self, iterations, a_ns, losses):
+        """Feed one chunk, as produced by GradientDescent.iterate_chunks"""
+        keep = iterations % self.stride == 0
+        self.iterations.extend(iterations[keep].tolist())
+        self.a_ns.extend(a_ns[keep].tolist())
+        self.losses.extend(losses[keep].tolist())
+        self.last = (int(iterations[-1]), float(a_ns[-1]), float(losses[-1]))
+        while len(self.iterations) > self.max_points:
+            self.stride *= 2
+            kept = [i for i, n in enumerate(self.iterations) if n % self.stride == 0]
+            self.iterations = [self.iterations[i] for i in kept]
+            self.a_ns = [self.a_ns[i] for i in kept]
+            self.losses = [self.losses[i] for i in kept]
+
+    def arrays(self):
+        """(iterations, a_ns, losses) of the kept points, ending with the most recent iterate"""
+        iterations, a_ns, losses = self.iterations, self.a_ns, self.losses
+        if self.last is not None and (not iterations or iterations[-1] != self.last[0]):
+            iterations, a_ns, losses = iterations + [self.last[0]], a_ns + [self.last[1]], losses + [self.last[2]]
+        return np.array(iterations), np.array(a_ns), np.array(losses)
+
+
+def swarm_points(a_ns):
+    """(xs, ys) of a swarm of 2D points (shape (n_runs, n_iterations, 2)) for plot_swarm, as float32 with the
+    points that can't be drawn set to NaN, and whether each run ends with a finite iterate"""
+    with np.errstate(over='ignore', invalid='ignore'):
+        visible = np.all(np.isfinite(a_ns), axis=-1)
+    points = np.where(visible[..., None], a_ns, np.nan).astype(np.float32)
+    return points[..., 0], points[..., 1], visible[:, -1]
+
+
+def band_colors(finite, final_losses):
+    """One color per run of a swarm: whether it ends in the goal band (gray if it diverged)"""
+    palette = np.array(px.colors.qualitative.Plotly)
+    return np.where(finite, np.where(final_losses <= GOAL_BAND, palette[0], palette[1]), "lightgray")
+
+
+def animation_controls(frame_names):
+    """Play/Pause buttons and iteration slider shared by our animated figures"""
+    updatemenus = [{
+        'type': 'buttons',
+        'showactive': False,
+        'buttons': [
+            {'label': 'Play', 'method': 'animate',
+            'args': [None, {'frame': {'duration': 600, 'redraw': True},
+                            'fromcurrent': True, 'transition': {'duration': 200}}]},
+            {'label': 'Pause', 'method': 'animate',
+            'args': [[None], {'frame': {'duration': 0, 'redraw': False},
+                            'mode': 'immediate', 'transition': {'duration': 0}}]}
+        ]
+    }]
+    sliders = [{
+        'steps': [
+            {'args': [[name], {'frame': {'duration': 0, 'redraw': True}, 'mode': 'immediate'}],
+            'label': name, 'method': 'animate'}
+            for name in frame_names
+        ],
+        'transition': {'duration': 200},
+        'x': 0,
+        'y': -0.2,
+        'currentvalue': {'prefix': 'Iteration: '}
+    }]
+    return updatemenus, sliders
+
+
+class GradientDescent2D(GradientDescent):
+    """Gradient descent on the functions of two variables of catalogue_2d: a₀ and the iterates are (x, y) vectors.
+    The meshes, contour levels and minima come from the shared Surfaces, so plotting costs no evaluation of f."""
+    def __init__(self, X_MIN, X_MAX, sim_counter, n_pts = 200, max_iter = 15):
+        # Same rotation over the functions as in 1D, see load_objectives
+        super().__init__(X_MIN, X_MAX, sim_counter, n_pts, max_iter)
+
+
+    def load_objectives(self, X_MIN, X_MAX, n_pts):
+        return get_surfaces(X_MIN, X_MAX, n_pts)
+
+
+    def set_loss_reference(self, loss_reference, verbose=False):
+        """Surfaces have no index of their local minima: the loss is always measured against the global minimum"""
+        assert loss_reference == "global", f"Only the global minimum can be the loss reference in 2D, not {loss_reference}"
+        super().set_loss_reference(loss_reference, verbose)
+
+
+    def set_a_0(self, a_0_value, verbose=False):
+        """Set the initial point (a₀) to the given (x, y) value."""
+        super().set_a_0(np.asarray(a_0_value, dtype=float).reshape(2), verbose)
+
+
+    def gradient_descent(self, tol=None, blowup=None):
+        """Run the algorithm from self.a_0 with learning rate self.eta, see GradientDescent.gradient_descent for
+        the early stopping options (|.| being the euclidean norm here)."""
+        assert self.eta is not None, "Please use self.set_eta to define the learning rate before running the algorithm."
+        assert self.a_0 is not None, "Please use self.set_a_0 to define the initial point before running the algorithm."
+
+        assert type(self.step_rule) is StepRule, "Only plain gradient descent runs on functions of two variables."
+
+        a_ns, losses = self.gradient_descent_batch(self.a_0, self.eta)
+        n_steps, self.stop_reason = stopping_point(a_ns[0], tol, blowup)
+        a_ns, losses = a_ns[0, :n_steps], losses[0, :n_steps]
+        with np.errstate(over='ignore', invalid='ignore'):
+            self.trajectory = Trajectory(a_ns, self.f(a_ns[:, 0], a_ns[:, 1]), losses)
+            self.diagnostics = diagnose(self.trajectory, self.objective)
+        return self.trajectory
+
+
+    def gradient_descent_batch(self, a0s, etas):
+        """Vectorized runs from many 2D starting points, see gradient_descent_batch_2d"""
+        return gradient_descent_batch_2d(self.f, self.grad_f, a0s, etas, self.max_iter, self.objective.f_min)
+
+
+    def swarm(self, n_points=200):
+        """Run the algorithm with learning rate self.eta from a grid of about n_points starting points covering the
+        window. Returns the iterates and the losses as (n_points, max_iter, 2) and (n_points, max_iter) arrays."""
+        assert self.eta is not None, "Please use self.set_eta to define the learning rate before running the algorithm."
+        side = np.linspace(self.X_MIN, self.X_MAX, max(2, round(np.sqrt(n_points))))
+        return self.gradient_descent_batch(np.stack(np.meshgrid(side, side), axis=-1).reshape(-1, 2), self.eta)
+
+
+    def plot_swarm(self, a_ns, losses):
+        """Animation of many runs at once (see self.swarm) on the contour plot of f, each point colored by whether
+        its run ends in the goal band"""
+        xs, ys, finite = swarm_points(a_ns)
+        background = [self.contour_trace(),
+                      go.Scatter(x=[self.true_min[0]], y=[self.true_min[1]], mode='markers', hoverinfo='skip',
+                                 marker=dict(size=9, color='rgba(144, 238, 144, 0.8)', line=dict(color='lightgreen', width=2)))]
+        return self.swarm_figure(background, xs, ys, band_colors(finite, losses[:, -1]), losses,
+                                 xaxis=dict(range=[self.X_MIN, self.X_MAX], title="x"),
+                                 yaxis=dict(range=[self.X_MIN, self.X_MAX], title="y", scaleanchor='x'))
+
+
+    def compute_loss(self, x):
+        return abs(self.f(x[..., 0], x[..., 1]) - self.objective.f_min)
+
+
+    def goal_minimum(self):
+        return self.true_min, self.objective.f_min
+
+
+    def contour_trace(self, **kwargs):
+        return go.Contour(x=self.objective.x, y=self.objective.x, z=self.objective.z,
+                          contours=dict(**self.objective.levels, coloring='heatmap'),
+                          colorscale='Earth', showscale=False, hoverinfo='skip', **kwargs)
+
+
+    def plot_naked_function(self):
+        """Contour plot of the current function with arrows pointing downhill (-∇f)"""
+        import plotly.figure_factory as ff # it imports pandas, only needed here
+        fig = go.Figure(self.contour_trace())
+        xq, yq, u, v = self.objective.field
+        arrow_length = 0.5 * (self.X_MAX - self.X_MIN) / xq.shape[0]
+        quiver = ff.create_quiver(xq, yq, u, v, scale=arrow_length, arrow_scale=0.3, line=dict(color='white', width=1))
+        fig.add_traces(quiver.data)
+        fig.add_trace(go.Scatter(x=[self.true_min[0]], y=[self.true_min[1]], mode='markers',
+                                 marker=dict(size=9, color='rgba(144, 238, 144, 0.8)', line=dict(color='lightgreen', width=2)),
+                                 hoverinfo='skip'))
+        fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), showlegend=False,
+                          xaxis=dict(range=[self.X_MIN, self.X_MAX]),
+                          yaxis=dict(range=[self.X_MIN, self.X_MAX], scaleanchor='x'))
+        return fig
+
+
+    def plot_iterations_and_loss(self):
+        """Contour plot of f with the iterates of the algorithm, along with the corresponding losses"""
+        fig = make_subplots(rows=1, cols=2, subplot_titles=("Gradient Descent Path", "Loss Curve"))
+        trajectory = self.trajectory
+        iterations = trajectory.iterations
+
+        # ===== Left subplot: contour of f + GD path =====
+        fig.add_trace(self.contour_trace(), row=1, col=1)  # trace 0
+        fig.add_trace(go.Scatter(x=[self.true_min[0]], y=[self.true_min[1]], mode='markers',
+                                 marker=dict(size=9, color='rgba(144, 238, 144, 0.8)', line=dict(color='lightgreen', width=2)),
+                                 hoverinfo='skip'), row=1, col=1)  # trace 1
+        fig.add_trace(go.Scatter(x=trajectory.a_ns[:1, 0], y=trajectory.a_ns[:1, 1], mode="markers+lines",
+                                 marker=dict(color="red", size=7), line=dict(color="red"), name="GD Path"), row=1, col=1)  # trace 2
+
+        # ===== Right subplot: Loss curve =====
+        fig.add_trace(go.Scatter(x=[], y=[], mode="markers+lines", marker=dict(color="red", size=7), name="Loss"),
+                      row=1, col=2)  # trace 3
+        for fill_y, fill_opt in [([GOAL_BAND, GOAL_BAND], None), ([0, 0], 'tonexty')]:
+            fig.add_trace(go.Scatter(x=[-1, iterations[-1] + 1], y=fill_y, fill=fill_opt, mode='lines', line=dict(width=0),
+                                     fillcolor='rgba(144, 238, 144, 0.3)' if fill_opt else None,
+                                     showlegend=False, hoverinfo='skip'), row=1, col=2)
+
+        # ===== Frames: only the path and the loss change =====
+        fig.frames = [
+            go.Frame(
+                data=[go.Scatter(x=trajectory.a_ns[:i + 1, 0], y=trajectory.a_ns[:i + 1, 1]),
+                      go.Scatter(x=iterations[:i + 1], y=trajectory.losses[:i + 1])],
+                traces=[2, 3],
+                name=str(i)
+            )
+            for i in iterations
+        ]
+
+        updatemenus, sliders = animation_controls([str(i) for i in iterations])
+        fig.update_layout(
+            height=700,
+            xaxis=dict(range=[self.X_MIN, self.X_MAX], title="x"),
+            yaxis=dict(range=[self.X_MIN, self.X_MAX], title="y", scaleanchor='x'),
+            xaxis2=dict(range=[-1, max(self.max_iter, len(trajectory))], title="Iteration"),
+            yaxis2=dict(range=[-0.1, self.trajectory.max_finite_loss() + 0.1], title="Loss"),
+            showlegend=False,
+            updatemenus=updatemenus,
+            sliders=sliders,
+        )
+        return fig
+
+
+    def plot_surface(self):
+        """3D view of the surface with the path of the last run on it"""
+        fig = go.Figure(go.Surface(x=self.objective.x, y=self.objective.x, z=self.objective.z,
+                                   colorscale='Earth', showscale=False, opacity=0.9))
+        if self.trajectory is not None:
+            fig.add_trace(go.Scatter3d(x=self.trajectory.a_ns[:, 0], y=self.trajectory.a_ns[:, 1], z=self.trajectory.f_a_ns,
+                                       mode='markers+lines', marker=dict(color='red', size=4), line=dict(color='red')))
+        fig.update_layout(height=700, margin=dict(l=0, r=0, t=0, b=0), showlegend=False,
+                          scene=dict(zaxis=dict(range=[self.objective.z_min, self.objective.z_max])))
+        return fig
+
+
+class GradientDescentND(GradientDescent):
+    """Gradient descent on an N-dimensional quadratic ½xᵀAx - bᵀx (objectives.Quadratic): a₀ and the iterates are
+    vectors of R^dim, dim going up to ~10⁴. Paths are shown in the plane of the slowest and fastest directions of A
+    (its eigenvectors of smallest and largest eigenvalue), where the level sets are ellipses of aspect ratio √κ."""
+    def __init__(self, dim, condition_number, seed=0, max_iter=15):
+        self.dim = dim
+        self.init_run_settings(max_iter) # the trajectory keeps the full iterates
+
+        # a single function, outside of the rotation of the catalogue
+        self.simulation_counter = None
+        self.all_fs = None
+        self.f_idx = None
+        self.use_objective(get_quadratic(dim, condition_number, seed))
+
+
+    def set_a_0(self, a_0_value, verbose=False):
+        """Set the initial point (a₀) to the given vector of R^dim."""
+        super().set_a_0(np.asarray(a_0_value, dtype=float).reshape(self.dim), verbose)
+
+
+    def random_a0s(self, n_runs, radius=1.0, seed=None):
+        """n_runs starting points drawn uniformly on the sphere of the given radius around the minimum, as an
+        (n_runs, dim) array"""
+        directions = np.random.default_rng(seed).standard_normal((n_runs, self.dim))
+        return self.true_min + radius * directions / np.linalg.norm(directions, axis=1, keepdims=True)
+
+
+    def gradient_descent(self, tol=None, blowup=None):
+        """Run the algorithm from self.a_0 with learning rate self.eta, see GradientDescent.gradient_descent for
+        the early stopping options (|.| being the euclidean norm here)."""
+        assert self.eta is not None, "Please use self.set_eta to define the learning rate before running the algorithm."
+        assert self.a_0 is not None, "Please use self.set_a_0 to define the initial point before running the algorithm."
+
+        assert type(self.step_rule) is StepRule, "Only plain gradient descent runs on quadratics in N dimensions."
+
+        a_ns, losses = gradient_descent_batch_nd(self.objective, self.a_0, self.eta, self.max_iter, projected=False)
+        n_steps, self.stop_reason = stopping_point(a_ns[0], tol, blowup)
+        a_ns, losses = a_ns[0, :n_steps], losses[0, :n_steps]
+        with np.errstate(over='ignore', invalid='ignore'):
+            self.trajectory = Trajectory(a_ns, self.f(a_ns.T), losses)
+            self.diagnostics = diagnose(self.trajectory, self.objective)
+        return self.trajectory
+
+
+    def gradient_descent_batch(self, a0s, etas):
+        """Vectorized runs from many starting points of R^dim, see gradient_descent_batch_nd (projected iterates)"""
+        return gradient_descent_batch_nd(self.objective, a0s, etas, self.max_iter)
+
+
+    def swarm(self, n_points=200, radius=1.0, seed=None):
+        """Run the algorithm with learning rate self.eta from n_points starting points on a sphere around the
+        minimum (see random_a0s). Returns the projected iterates and the losses, see gradient_descent_batch."""
+        assert self.eta is not None, "Please use self.set_eta to define the learning rate before running the algorithm."
+        return self.gradient_descent_batch(self.random_a0s(n_points, radius, seed), self.eta)
+
+
+    def plot_swarm(self, a_ns, losses):
+        """Animation of many runs at once (see self.swarm, whose iterates are already projected) on the level sets
+        of f in the plane of the slowest and fastest directions"""
+        xs, ys, finite = swarm_points(a_ns)
+        extent = self.extent(a_ns.reshape(-1, 2))
+        background = [self.contour_trace(extent),
+                      go.Scatter(x=[0], y=[0], mode='markers', hoverinfo='skip',
+                                 marker=dict(size=9, color='rgba(144, 238, 144, 0.8)', line=dict(color='lightgreen', width=2)))]
+        return self.swarm_figure(background, xs, ys, band_colors(finite, losses[:, -1]), losses,
+                                 xaxis=dict(range=[-extent, extent], title="slowest direction (λ = μ)"),
+                                 yaxis=dict(range=[-extent, extent], title="fastest direction (λ = L)", scaleanchor='x'))
+
+
+    def compute_loss(self, x):
+        residual = np.asarray(x) - self.true_min
+        return np.abs(0.5 * np.sum(residual * (residual @ self.objective.A), axis=-1))
+
+
+    def goal_minimum(self):
+        return self.true_min, self.objective.f_min
+
+
+    def contour_trace(self, extent, n_pts=100):
+        """Level sets of f in the projection plane: f(x* + s·v_slow + t·v_fast) - f_min = ½(μs² + Lt²)"""
+        s = np.linspace(-extent, extent, n_pts)
+        S, T = np.meshgrid(s, s)
+        z = 0.5 * (self.objective.mu * S**2 + self.objective.L * T**2)
+        return go.Contour(x=s, y=s, z=z, contours=dict(start=0, end=float(z.max()) / 4, size=float(z.max()) / 80,
+                                                       coloring='heatmap'),
+                          colorscale='Earth', showscale=False, hoverinfo='skip')
+
+
+    def extent(self, points):
+        """Half-width of a square window around the minimum containing the projected points"""
+        points = points[np.all(np.isfinite(points), axis=-1)]
+        return 1.15 * float(np.abs(points).max()) if points.size and np.abs(points).max() > 0 else 1.0
+
+
+    def plot_naked_function(self):
+        """Level sets of f in the plane of the slowest and fastest directions, around the minimum"""
+        extent = self.extent(self.objective.project(self.a_0)[None]) if self.a_0 is not None else 1.0
+        fig = go.Figure(self.contour_trace(extent))
+        fig.add_trace(go.Scatter(x=[0], y=[0], mode='markers', hoverinfo='skip',
+                                 marker=dict(size=9, color='rgba(144, 238, 144, 0.8)', line=dict(color='lightgreen', width=2))))
+        fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), showlegend=False,
+                          xaxis=dict(range=[-extent, extent], title="slowest direction (λ = μ)"),
+                          yaxis=dict(range=[-extent, extent], title="fastest direction (λ = L)", scaleanchor='x'))
+        return fig
+
+
+    def plot_iterations_and_loss(self):
+        """Path of the algorithm projected on the plane of the slowest and fastest directions, along with the losses
+        (on a log scale: on a quadratic, gradient descent converges linearly)"""
+        fig = make_subplots(rows=1, cols=2, subplot_titles=("Gradient Descent Path (2D projection)", "Loss Curve"))
+        trajectory = self.trajectory
+        iterations = trajectory.iterations
+        path = self.objective.project(trajectory.a_ns)
+        extent = self.extent(path)
+
+        # ===== Left subplot: level sets + projected GD path =====
+        fig.add_trace(self.contour_trace(extent), row=1, col=1)  # trace 0
+        fig.add_trace(go.Scatter(x=[0], y=[0], mode='markers', hoverinfo='skip',
+                                 marker=dict(size=9, color='rgba(144, 238, 144, 0.8)', line=dict(color='lightgreen', width=2))),
+                      row=1, col=1)  # trace 1
+        fig.add_trace(go.Scatter(x=path[:1, 0], y=path[:1, 1], mode="markers+lines",
+                                 marker=dict(color="red", size=7), line=dict(color="red"), name="GD Path"), row=1, col=1)  # trace 2
+
+        # ===== Right subplot: Loss curve, with the goal band below GOAL_BAND =====
+        fig.add_trace(go.Scatter(x=[], y=[], mode="markers+lines", marker=dict(color="red", size=7), name="Loss"),
+                      row=1, col=2)  # trace 3
+        finite = trajectory.losses[np.isfinite(trajectory.losses) & (trajectory.losses > 0)]
+        low = np.log10(min(finite.min(), GOAL_BAND)) - 0.5 if finite.size else -3
+        high = np.log10(max(finite.max(), GOAL_BAND)) + 0.5 if finite.size else 1
+        fig.add_hrect(y0=10 ** low, y1=GOAL_BAND, fillcolor='rgba(144, 238, 144, 0.3)', line_width=0, row=1, col=2)
+
+        # ===== Frames: only the path and the loss change =====
+        fig.frames = [
+            go.Frame(
+                data=[go.Scatter(x=path[:i + 1, 0], y=path[:i + 1, 1]),
+                      go.Scatter(x=iterations[:i + 1], y=trajectory.losses[:i + 1])],
+                traces=[2, 3],
+                name=str(i)
+            )
+            for i in iterations
+        ]
+
+        updatemenus, sliders = animation_controls([str(i) for i in iterations])
+        fig.update_layout(
+            height=700,
+            xaxis=dict(range=[-extent, extent], title="slowest direction (λ = μ)"),
+            yaxis=dict(range=[-extent, extent], title="fastest direction (λ = L)", scaleanchor='x'),
+            xaxis2=dict(range=[-1, max(self.max_iter, len(trajectory))], title="Iteration"),
+            yaxis2=dict(type="log", range=[low, high], title="Loss"),
+            showlegend=False,
+            updatemenus=updatemenus,
+            sliders=sliders,
+        )
+        return fig
+
+
+if __name__ == "__main__":
+    # checks of the swarm in every dimension: python -m pages.src.GradientDescent
+    for GD in (GradientDescent(-2.5, 2.5, 0), GradientDescent2D(-2.5, 2.5, 0), GradientDescentND(50, 10.0)):
+        GD.set_eta(0.05)
+        a_ns, losses = GD.swarm(25)
+        fig = GD.plot_swarm(a_ns, losses)
+        assert len(fig.data) == 4 and len(fig.frames) == GD.max_iter, type(GD).__name__
+        assert np.isfinite(fig.frames[-1].data[0].x).all(), type(GD).__name__
+    print("swarm checks passed in 1, 2 and N dimensions")
@@ -0,0 +1,31 @@
+import streamlit as st
+from pages.src.GradientDescent import simulate_trajectories, trajectory_table
+from pages.src.objectives import catalogue, get_objectives
+from pages.src.shared_cache import shared_arrays, share_grids
+from pages.src.prefetch import Prefetcher
+
+
+# ACTIVITY RESOURCES:
+# what the PS activity shares between all its sessions (one per process, held by st.cache_resource). Only
+# psactivity imports this module, so that the other pages don't load SymPy, plotly and the catalogue with utils.
+
+@st.cache_resource
+def get_trajectory_table(X_MIN, X_MAX, ETA_MIN, ETA_MAX):
+    """All the trajectories of the PS activity, shared by every session. They are simulated once per machine:
+    the other Streamlit processes map the arrays of the first one (see shared_cache)."""
+    key = ("trajectories", X_MIN, X_MAX, ETA_MIN, ETA_MAX, tuple(catalogue.items()))
+    arrays = shared_arrays(key, lambda: simulate_trajectories(X_MIN, X_MAX, ETA_MIN, ETA_MAX))
+    return trajectory_table(arrays, X_MIN, X_MAX, ETA_MIN, ETA_MAX)
+
+
+@st.cache_resource
+def get_prefetcher():
+    """The background thread pool warming the next functions of the activity, one per process (see prefetch)"""
+    return Prefetcher()
+
+
+@st.cache_resource
+def share_catalogue(X_MIN, X_MAX):
+    """Map the grids of the catalogue objectives from shared memory, so that every Streamlit process of the machine
+    uses the same copy"""
+    return share_grids(("objectives", X_MIN, X_MAX, tuple(catalogue.items())), get_objectives(X_MIN, X_MAX))
@@ -0,0 +1,138 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
+from numpy.lib.format import open_memmap
+import plotly.graph_objects as go
+from pages.src.objectives import catalogue, catalogue_objective, ReadOnly, DEFAULT_X_MIN, DEFAULT_X_MAX
+from pages.src.GradientDescent import gradient_descent_batch
+from pages.src.diagnostics import diagnose_batch, OUTCOMES
+
+
+# CONVERGENCE ATLAS:
+# for every catalogue function, the outcome of plain gradient descent from every (a₀, η) of a dense grid.
+# It is built offline (python -m pages.src.atlas) across all the cores, and stored as .npy files that are only ever
+# opened as memory maps: a query reads a single entry, a heatmap only the rows it shows.
+
+ATLAS_DIR = os.path.join(os.path.dirname(__file__), "atlas")
+
+# Stored fields and their dtypes
+atlas_fields = {"iteration_to_band": np.int16, "final_loss": np.float32, "outcome": np.int8}
+
+# Number of starting points simulated by one task of the process pool
+ROWS_PER_TASK = 64
+
+
+def atlas_path(name, field, directory=ATLAS_DIR):
+    return os.path.join(directory, f"{name}_{field}.npy")
+
+
+def _sweep_rows(name, X_MIN, X_MAX, a0s, etas, max_iter):
+    """Simulate the runs of a block of starting points against all the learning rates (in a worker process)"""
+    objective = catalogue_objective(name, X_MIN, X_MAX)
+    a_ns, losses = gradient_descent_batch(objective.f, objective.grad_f, a0s[:, None], etas[None, :], max_iter,
+                                          objective.f_min)
+    shape = (a0s.size, etas.size)
+    return tuple(field.reshape(shape) for field in diagnose_batch(a_ns, losses))
+
+
+def build_atlas(X_MIN=DEFAULT_X_MIN, X_MAX=DEFAULT_X_MAX, ETA_MIN=0.001, ETA_MAX=100.0, n_a0=1001, n_eta=401,
+                max_iter=15, directory=ATLAS_DIR, processes=None):
+    """Sweep a n_a0 x n_eta grid (a₀ evenly spaced on [X_MIN, X_MAX], η log-spaced on [ETA_MIN, ETA_MAX]) for every
+    catalogue function, and write one (n_a0, n_eta) .npy file per function and field (see atlas_fields).
+    Blocks of ROWS_PER_TASK starting points are simulated in parallel and written as soon as they are done."""
+    os.makedirs(directory, exist_ok=True)
+    a0s = np.linspace(X_MIN, X_MAX, n_a0)
+    etas = np.logspace(np.log10(ETA_MIN), np.log10(ETA_MAX), n_eta)
+    np.save(os.path.join(directory, "a0s.npy"), a0s)
+    np.save(os.path.join(directory, "etas.npy"), etas)
+
+    with ProcessPoolExecutor(processes) as pool:
+        for name in catalogue:
+            outputs = [open_memmap(atlas_path(name, field, directory), mode="w+", dtype=dtype, shape=(n_a0, n_eta))
+                       for field, dtype in atlas_fields.items()]
+            starts = range(0, n_a0, ROWS_PER_TASK)
+            tasks = [pool.submit(_sweep_rows, name, X_MIN, X_MAX, a0s[start:start + ROWS_PER_TASK], etas, max_iter)
+                     for start in starts]
+            for start, task in zip(starts, tasks):
+                for output, block in zip(outputs, task.result()):
+                    # diverged runs have losses too large for float32, they are stored as inf
+                    with np.errstate(over='ignore'):
+                        output[start:start + block.shape[0]] = block
+            for output in outputs:
+                output.flush()
+
+
+class Atlas(ReadOnly):
+    """Memory-mapped convergence atlas of one catalogue function, see build_atlas"""
+    __slots__ = ("name", "a0s", "etas", "iteration_to_band", "final_loss", "outcome")
+
+    def __init__(self, name, directory):
+        fields = {field: np.load(atlas_path(name, field, directory), mmap_mode="r") for field in atlas_fields}
+        self._set(name=name, a0s=np.load(os.path.join(directory, "a0s.npy")),
+                  etas=np.load(os.path.join(directory, "etas.npy")), **fields)
+
+    def index(self, a_0, eta):
+        """Grid indices of the closest (a₀, η), computed from the grid spacing (η is log-spaced) in O(1)"""
+        i = round((a_0 - self.a0s[0]) / (self.a0s[-1] - self.a0s[0]) * (self.a0s.size - 1))
+        log_etas = np.log10(self.etas[[0, -1]])
+        j = round((np.log10(eta) - log_etas[0]) / (log_etas[1] - log_etas[0]) * (self.etas.size - 1))
+        return min(max(i, 0), self.a0s.size - 1), min(max(j, 0), self.etas.size - 1)
+
+    def query(self, a_0, eta):
+        """Outcome of the run from the grid point closest to (a₀, η), as a dict of plain Python values"""
+        i, j = self.index(a_0, eta)
+        iteration_to_band = int(self.iteration_to_band[i, j])
+        return {
+            'a_0': float(self.a0s[i]),
+            'eta': float(self.etas[j]),
+            'iteration_to_band': iteration_to_band if iteration_to_band >= 0 else None,
+            'final_loss': float(self.final_loss[i, j]),
+            'outcome': OUTCOMES[self.outcome[i, j]],
+        }
+
+    def plot_heatmap(self, field="outcome", max_rows=200, max_cols=200, marker=None):
+        """Heatmap of a field over (η, a₀), keeping at most max_rows x max_cols cells (so only the rows shown are read).
+        marker=(a_0, eta) highlights a run, e.g. the one the student just simulated."""
+        row_step = -(-self.a0s.size // max_rows)
+        col_step = -(-self.etas.size // max_cols)
+        z = np.asarray(getattr(self, field)[::row_step, ::col_step], dtype=float)
+        if field == "iteration_to_band":
+            z[z < 0] = np.nan # never reached the band
+        colorbar = dict(tickvals=list(range(len(OUTCOMES))), ticktext=list(OUTCOMES)) if field == "outcome" else None
+        fig = go.Figure(go.Heatmap(x=self.etas[::col_step], y=self.a0s[::row_step], z=z, colorbar=colorbar,
+                                   colorscale="Viridis", zsmooth=False))
+        if marker is not None:
+            fig.add_trace(go.Scatter(x=[marker[1]], y=[marker[0]], mode="markers",
+                                     marker=dict(color="red", size=10, symbol="x"), showlegend=False))
+        fig.update_layout(xaxis=dict(type="log", title="η"), yaxis=dict(title="a₀"), margin=dict(l=0, r=0, t=30, b=0),
+                          title=field.replace("_", " "))
+        return fig
+
+    def __repr__(self):
+        return f"Atlas({self.name!r}, shape={self.outcome.shape})"
+
+
+@lru_cache(maxsize=None)
+def _load_atlas(name, directory):
+    return Atlas(name, directory)
+
+
+def get_atlas(name, directory=ATLAS_DIR):
+    """The (cached) atlas of a catalogue function, None if it hasn't been built yet"""
+    if not os.path.exists(atlas_path(name, "outcome", directory)):
+        return None
+    return _load_atlas(name, directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the convergence atlas of the catalogue functions")
+    parser.add_argument("--n-a0", type=int, default=1001)
+    parser.add_argument("--n-eta", type=int, default=401)
+    parser.add_argument("--max-iter", type=int, default=15)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--directory", default=ATLAS_DIR)
+    args = parser.parse_args()
+    build_atlas(n_a0=args.n_a0, n_eta=args.n_eta, max_iter=args.max_iter, directory=args.directory,
+                processes=args.processes)
@@ -0,0 +1,194 @@
+import multiprocessing
+import re
+import time
+from functools import lru_cache
+import numpy as np
+from sympy import Abs, Float, Integer, Interval, Rational, Symbol, E, pi, sin, cos, tan, atan, sinh, cosh, tanh, exp, log, sqrt, latex, sympify
+from sympy.calculus.util import continuous_domain
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations, convert_xor, implicit_multiplication_application
+from pages.src.objectives import Objective, x_symbol, derive_forms, compile_kernel, check_derivative, stationary_index, true_minimizer, DEFAULT_X_MIN, DEFAULT_X_MAX
+
+
+# USER-DEFINED MOUNTAINS:
+# students can type their own f(x). The text is parsed by SymPy against a whitelist of names, then analysed
+# (derivatives, stationary points, sampled curve) in a separate process that is killed if it takes too long,
+# so that a pathological expression (e.g. 9^9^9) can't stall the server. The worker sends back f, f' and f'' as
+# text in their final form, the server only compiles them (see compile_forms). The resulting objectives are kept in
+# bounded LRU caches keyed by the canonical expression, shared by all sessions of the process.
+
+# Names a student may use, with the spelling they are likely to type
+allowed_names = {
+    "x": x_symbol, "pi": pi, "E": E,
+    "sin": sin, "cos": cos, "tan": tan, "atan": atan, "arctan": atan,
+    "sinh": sinh, "cosh": cosh, "tanh": tanh,
+    "exp": exp, "log": log, "ln": log, "sqrt": sqrt, "abs": Abs, "Abs": Abs,
+}
+
+# Characters allowed in an expression: no quotes, brackets, commas, '=' or ':' (so no lambda, keyword, indexing...)
+ALLOWED_CHARACTERS = re.compile(r"^[0-9A-Za-z_+\-*/^().\s]*$")
+# attribute access such as x.func (a '.' that doesn't belong to a number)
+ATTRIBUTE_ACCESS = re.compile(r"[A-Za-z_)]\s*\.|\.\s*[A-Za-z_(]")
+MAX_LENGTH = 200
+# Longest f, f' or f'' the server compiles, which bounds the work left to it
+MAX_FORM_LENGTH = 10 * MAX_LENGTH
+
+# Budgets of the analysis of a new expression, in seconds: the whole analysis (parsing, derivatives, stationary
+# points, ...) and the evaluation of f, f' and f'' on the sampled grid
+COMPILE_BUDGET = 5.0
+EVAL_BUDGET = 0.05
+
+# Number of expressions kept in the caches
+CACHE_SIZE = 128
+
+# Workers are forked from a forkserver that imports the objectives module (SymPy, NumPy and the catalogue, 1-1.5 s)
+# once, when the first worker is started. Starting a worker waits for the server, so this import isn't counted in
+# COMPILE_BUDGET. Without forkserver, every spawned worker imports it again.
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+ANALYSIS_CONTEXT = multiprocessing.get_context(START_METHOD)
+if START_METHOD == "forkserver":
+    ANALYSIS_CONTEXT.set_forkserver_preload(["pages.src.objectives"])
+
+
+class ExpressionError(ValueError):
+    """A user expression that can't be used as a mountain, the message can be shown to the student"""
+
+
+def check_characters(text):
+    """Cheap checks done before anything is parsed"""
+    if len(text) > MAX_LENGTH:
+        raise ExpressionError(f"The expression is too long (at most {MAX_LENGTH} characters)")
+    if not ALLOWED_CHARACTERS.match(text) or "__" in text or ATTRIBUTE_ACCESS.search(text):
+        raise ExpressionError("The expression contains characters that are not allowed")
+
+
+def parse_expression(text):
+    """Parse a user expression of x into a SymPy expression, accepting only the names of allowed_names.
+    ^ is a power and implicit products (2x, 3sin(x)) are accepted."""
+    check_characters(text)
+    # no builtins: only the whitelisted names (and the classes SymPy's parser needs for numbers) can be reached
+    global_dict = {"__builtins__": {}, "Integer": Integer, "Float": Float, "Rational": Rational, "Symbol": Symbol}
+    try:
+        expr = parse_expr(text, local_dict=dict(allowed_names), global_dict=global_dict,
+                          transformations=standard_transformations + (convert_xor, implicit_multiplication_application))
+    except Exception:
+        raise ExpressionError("The expression could not be read")
+    if not hasattr(expr, "free_symbols"):
+        raise ExpressionError("The expression could not be read")
+    unknown = expr.free_symbols - {x_symbol}
+    if unknown:
+        raise ExpressionError(f"Unknown names in the expression: {', '.join(sorted(map(str, unknown)))}")
+    return expr
+
+
+def compile_forms(forms):
+    """Kernels of f, f' and f'' from the text of their kernel_form, as sent back by analyse_expression.
+    Nothing is derived or simplified, so this takes time in proportion to the length of the text."""
+    return tuple(compile_kernel(sympify(form, locals={"x": x_symbol})) for form in forms)
+
+
+def analyse_expression(text, X_MIN, X_MAX, n_pts):
+    """Everything that may take arbitrarily long for a user expression. Runs in a worker process, see _analyse.
+    Returns (canonical expression, its LaTeX, the forms of f, f' and f'' (see compile_forms), minima, maxima,
+    true_min) with plain Python values."""
+    expr = parse_expression(text)
+    canonical = str(expr)
+    if len(canonical) > 4 * MAX_LENGTH:
+        raise ExpressionError("The expression is too large once simplified")
+    # poles (1/x, tan(x)) fall between the grid points, so we ask SymPy where f is continuous
+    window = Interval(X_MIN, X_MAX)
+    if continuous_domain(expr, x_symbol, window) != window:
+        raise ExpressionError(f"The function must be defined and continuous everywhere between {X_MIN} and {X_MAX}")
+
+    forms = tuple(str(form) for form in derive_forms(expr))
+    if max(map(len, forms)) > MAX_FORM_LENGTH:
+        raise ExpressionError("The expression is too large once derived")
+
+    x = np.linspace(X_MIN, X_MAX, n_pts)
+    with np.errstate(all='ignore'):
+        # the very kernels the server will compile from the forms
+        f, grad_f, hess_f = compile_forms(forms)
+        check_derivative(f, grad_f, canonical)
+        check_derivative(grad_f, hess_f, canonical)
+        start = time.perf_counter()
+        values = [f(x), grad_f(x), hess_f(x)]
+        if time.perf_counter() - start > EVAL_BUDGET:
+            raise ExpressionError("The function is too slow to evaluate")
+        if not np.all(np.isfinite(values)):
+            raise ExpressionError(f"The function must be defined and continuous everywhere between {X_MIN} and {X_MAX}")
+        minima, maxima = stationary_index(canonical, X_MIN, X_MAX, n_pts)
+        true_min = true_minimizer(canonical, X_MIN, X_MAX, n_pts)
+    return canonical, latex(expr), forms, tuple(minima.tolist()), tuple(maxima.tolist()), true_min
+
+
+def _analysis_worker(connection, text, X_MIN, X_MAX, n_pts):
+    try:
+        connection.send(("ok", analyse_expression(text, X_MIN, X_MAX, n_pts)))
+    except ExpressionError as error:
+        connection.send(("error", str(error)))
+    except ValueError:
+        # check_derivative found a derivative that doesn't match the function
+        connection.send(("error", "The function is not smooth enough to be a mountain"))
+    except Exception:
+        connection.send(("error", "This function can't be used as a mountain"))
+    finally:
+        connection.close()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _analyse(text, X_MIN, X_MAX, n_pts):
+    """Run analyse_expression in a worker process, killed after COMPILE_BUDGET seconds.
+    The errors it reports are cached too, so a bad expression only costs its budget once. Timeouts and crashes
+    may come from a busy server rather than from the expression: they raise ExpressionError, which isn't cached."""
+    receiver, sender = ANALYSIS_CONTEXT.Pipe(duplex=False)
+    worker = ANALYSIS_CONTEXT.Process(target=_analysis_worker, args=(sender, text, X_MIN, X_MAX, n_pts), daemon=True)
+    worker.start()
+    sender.close()
+    try:
+        if receiver.poll(COMPILE_BUDGET):
+            return receiver.recv()
+        raise ExpressionError("This function takes too long to analyse")
+    except EOFError:
+        # the worker died without answering (e.g. out of memory)
+        raise ExpressionError("This function can't be used as a mountain")
+    finally:
+        receiver.close()
+        worker.kill()
+        worker.join()
+
+
+class CustomObjective(Objective):
+    """Objective of a user expression, with the same attributes as the catalogue ones.
+    Everything comes from the worker process, only the kernels are compiled here from their forms."""
+    __slots__ = ()
+
+    def __init__(self, canonical, latex_text, forms, minima, maxima, true_min, X_MIN, X_MAX, n_pts):
+        # the forms were printed by SymPy from a whitelisted expression, so parsing them again is safe (and quick)
+        x = np.linspace(X_MIN, X_MAX, n_pts)
+        with np.errstate(all='ignore'):
+            f, grad_f, hess_f = compile_forms(forms)
+            y = f(x)
+        minima, maxima = np.array(minima, dtype=float), np.array(maxima, dtype=float)
+        self._set(name=canonical, expression=canonical, f=f, grad_f=grad_f, hess_f=hess_f, latex=latex_text,
+                  X_MIN=X_MIN, X_MAX=X_MAX, x=x, y=y, y_min=float(y.min()), y_max=float(y.max()),
+                  true_min=true_min, f_min=float(f(true_min)), minima=minima, f_minima=f(minima), maxima=maxima,
+                  smooth_grad_f=grad_f, prox=None)
+
+    def __repr__(self):
+        return f"CustomObjective({self.expression!r}, X_MIN={self.X_MIN}, X_MAX={self.X_MAX}, n_pts={self.x.size})"
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _custom_objective(canonical, latex_text, forms, minima, maxima, true_min, X_MIN, X_MAX, n_pts):
+    # the analysis results only depend on canonical, so equal expressions share one objective
+    return CustomObjective(canonical, latex_text, forms, minima, maxima, true_min, X_MIN, X_MAX, n_pts)
+
+
+def get_custom_objective(text, X_MIN=DEFAULT_X_MIN, X_MAX=DEFAULT_X_MAX, n_pts=500):
+    """The (cached) objective of the expression typed by a student, e.g. "x^2 - 2cos(3x)".
+    Raises ExpressionError with a message for the student if it can't be used."""
+    text = " ".join(text.split())
+    check_characters(text)
+    status, result = _analyse(text, X_MIN, X_MAX, n_pts)
+    if status == "error":
+        raise ExpressionError(result)
+    return _custom_objective(*result, X_MIN, X_MAX, n_pts)
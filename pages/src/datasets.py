@@ -0,0 +1,181 @@
+import os
+from functools import lru_cache
+import numpy as np
+from pages.src.objectives import ReadOnly, golden_section_min, nearest_minimum, basin_minimum, DEFAULT_X_MIN, DEFAULT_X_MAX
+
+
+# DATA-DRIVEN OBJECTIVES:
+# instead of a closed-form mountain, f(a) is the average loss of a one-parameter model (prediction a * x_i)
+# over a dataset of (x_i, y_i) pairs stored in a .npy file. The file is only ever opened as a memory map and
+# read chunk by chunk, so the dataset can be larger than RAM.
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Rows read at once when streaming over the whole dataset
+CHUNK_SIZE = 65536
+# When evaluating many values of a at once, keep the (values of a) x (rows) temporary arrays around this size
+CHUNK_ELEMENTS = 2 ** 22
+
+dataset_kinds = {
+    # ½ (a x - y)², y = weight * x + noise
+    "least_squares": r"\frac{1}{2n} \sum_{i=1}^{n} \left(a x_i - y_i\right)^{2}",
+    # log(1 + exp(a x)) - y a x, y ∈ {0, 1} drawn with probability sigmoid(weight * x)
+    "logistic": r"\frac{1}{n} \sum_{i=1}^{n} \log\left(1 + e^{a x_i}\right) - y_i a x_i",
+}
+
+
+def sigmoid(t):
+    return 0.5 * (1 + np.tanh(0.5 * t)) # stable for large |t|
+
+
+def make_dataset(path, n_samples, kind="least_squares", weight=1.2, noise=0.5, seed=0):
+    """Generate a synthetic (x, y) dataset for the given kind of model directly into a .npy file, chunk by chunk,
+    so that n_samples is only limited by the disk. Returns the path."""
+    assert kind in dataset_kinds, f"Unknown dataset kind {kind}, please use one of {list(dataset_kinds)}"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    data = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(n_samples, 2))
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_samples, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, n_samples - start)
+        x = rng.normal(size=size)
+        if kind == "least_squares":
+            y = weight * x + noise * rng.normal(size=size)
+        else:
+            y = (rng.random(size) < sigmoid(weight * x)).astype(np.float64)
+        data[start:start + size, 0] = x
+        data[start:start + size, 1] = y
+    data.flush()
+    del data
+    return path
+
+
+def open_dataset(path):
+    """Read-only memory map of a dataset created by make_dataset, nothing is loaded until it is sliced"""
+    return np.load(path, mmap_mode="r")
+
+
+def sample_loss(kind, a, x, y):
+    """Loss of each sample (last axis) for each value of a (leading axes)"""
+    if kind == "least_squares":
+        return 0.5 * (a * x - y) ** 2
+    return np.logaddexp(0, a * x) - y * a * x
+
+
+def sample_grad(kind, a, x, y):
+    """Derivative of sample_loss with respect to a"""
+    if kind == "least_squares":
+        return (a * x - y) * x
+    return (sigmoid(a * x) - y) * x
+
+
+def sample_hess(kind, a, x, y):
+    """Second derivative of sample_loss with respect to a"""
+    if kind == "least_squares":
+        return x ** 2 + 0 * a
+    s = sigmoid(a * x)
+    return s * (1 - s) * x ** 2
+
+
+def streamed_mean(per_sample, data, a):
+    """Average of per_sample(a, x, y) over the whole dataset, for every value of a, reading the file chunk by chunk"""
+    a = np.asarray(a, dtype=float)
+    chunk = max(1, min(CHUNK_SIZE, CHUNK_ELEMENTS // max(a.size, 1)))
+    total = np.zeros(a.shape)
+    with np.errstate(over='ignore', invalid='ignore'):
+        for start in range(0, data.shape[0], chunk):
+            batch = data[start:start + chunk]
+            total += per_sample(a[..., None], batch[:, 0], batch[:, 1]).sum(axis=-1)
+    return total / data.shape[0]
+
+
+class DataObjective(ReadOnly):
+    """Objective built from a dataset: f(a) is the mean loss of the model a * x over the whole file.
+    It exposes the same attributes as objectives.Objective (f, grad_f, hess_f, latex, x, y, true_min, f_min, ...)
+    so it can be plugged into GradientDescent.set_objective, plus batch_grad for (mini-)batch steps.
+    Least squares only needs the sufficient statistics Σx², Σxy, Σy² (one pass over the file), the logistic loss
+    streams over the file at every full-batch evaluation."""
+    __slots__ = ("name", "kind", "path", "data", "n_samples", "f", "grad_f", "hess_f", "latex",
+                 "X_MIN", "X_MAX", "x", "y", "y_min", "y_max", "true_min", "f_min", "minima", "f_minima", "maxima",
+                 "smooth_grad_f", "prox")
+
+    def __init__(self, path, kind, X_MIN, X_MAX, n_pts):
+        assert kind in dataset_kinds, f"Unknown dataset kind {kind}, please use one of {list(dataset_kinds)}"
+        data = open_dataset(path)
+        n_samples = data.shape[0]
+
+        if kind == "least_squares":
+            s_xx, s_xy, s_yy = self._moments(data)
+            f = lambda a: 0.5 * (np.asarray(a) ** 2 * s_xx - 2 * np.asarray(a) * s_xy + s_yy)
+            grad_f = lambda a: np.asarray(a) * s_xx - s_xy
+            hess_f = lambda a: s_xx + 0 * np.asarray(a, dtype=float)
+            true_min = float(np.clip(s_xy / s_xx, X_MIN, X_MAX))
+        else:
+            f = lambda a: streamed_mean(lambda a, x, y: sample_loss(kind, a, x, y), data, a)
+            grad_f = lambda a: streamed_mean(lambda a, x, y: sample_grad(kind, a, x, y), data, a)
+            hess_f = lambda a: streamed_mean(lambda a, x, y: sample_hess(kind, a, x, y), data, a)
+            true_min = None
+
+        x = np.linspace(X_MIN, X_MAX, n_pts)
+        if true_min is None:
+            # Evaluating the exact loss for every point of the plotted curve would cost n_pts * n_samples logs,
+            # so the curve is drawn from a fine histogram of the x_i instead (the y_i only enter through mean(x y))
+            centers, weights, mean_xy = self._logistic_profile(data)
+            y = weights @ np.logaddexp(0, centers[:, None] * x[None, :]) - x * mean_xy
+            # the logistic loss is convex: bracket its minimum on the curve and refine it with the exact loss
+            i = int(np.argmin(y))
+            true_min = golden_section_min(lambda a: float(f(a)), x[max(i - 2, 0)], x[min(i + 2, n_pts - 1)], tol=1e-6)
+        else:
+            y = f(x)
+
+        self._set(name=os.path.splitext(os.path.basename(path))[0], kind=kind, path=path, data=data, n_samples=n_samples,
+                  f=f, grad_f=grad_f, hess_f=hess_f, latex=dataset_kinds[kind], X_MIN=X_MIN, X_MAX=X_MAX,
+                  x=x, y=y, y_min=float(y.min()), y_max=float(y.max()), true_min=true_min, f_min=float(f(true_min)))
+        # both losses are convex: their only stationary point is the global minimum
+        minima = np.array([true_min])
+        minima.flags.writeable = False
+        self._set(minima=minima, f_minima=np.array([self.f_min]), maxima=np.empty(0), smooth_grad_f=grad_f, prox=None)
+
+    @staticmethod
+    def _moments(data):
+        """Means of x², xy and y² over the dataset, in one streamed pass"""
+        total = np.zeros(3)
+        for start in range(0, data.shape[0], CHUNK_SIZE):
+            batch = data[start:start + CHUNK_SIZE]
+            x, y = batch[:, 0], batch[:, 1]
+            total += [x @ x, x @ y, y @ y]
+        return total / data.shape[0]
+
+    @staticmethod
+    def _logistic_profile(data, n_bins=4096):
+        """Histogram of the x_i (bin centers and frequencies) and mean of x_i y_i, in two streamed passes"""
+        x_min, x_max = np.inf, -np.inf
+        for start in range(0, data.shape[0], CHUNK_SIZE):
+            x = data[start:start + CHUNK_SIZE, 0]
+            x_min, x_max = min(x_min, x.min()), max(x_max, x.max())
+        counts = np.zeros(n_bins)
+        sum_xy = 0.
+        for start in range(0, data.shape[0], CHUNK_SIZE):
+            batch = data[start:start + CHUNK_SIZE]
+            counts += np.histogram(batch[:, 0], bins=n_bins, range=(x_min, x_max))[0]
+            sum_xy += batch[:, 0] @ batch[:, 1]
+        edges = np.linspace(x_min, x_max, n_bins + 1)
+        return (edges[:-1] + edges[1:]) / 2, counts / data.shape[0], sum_xy / data.shape[0]
+
+    def batch_grad(self, a, batch):
+        """Gradient of the mean loss over the rows of `batch` only (a slice of self.data)"""
+        return sample_grad(self.kind, a, batch[:, 0], batch[:, 1]).mean()
+
+    def nearest_minimum(self, a):
+        return nearest_minimum(self, a)
+
+    def basin_minimum(self, a):
+        return basin_minimum(self, a)
+
+    def __repr__(self):
+        return f"DataObjective({self.path!r}, kind={self.kind!r}, n_samples={self.n_samples})"
+
+
+@lru_cache(maxsize=None)
+def get_data_objective(path, kind="least_squares", X_MIN=DEFAULT_X_MIN, X_MAX=DEFAULT_X_MAX, n_pts=500):
+    """The (cached) DataObjective of a dataset file"""
+    return DataObjective(path, kind, X_MIN, X_MAX, n_pts)
@@ -0,0 +1,147 @@
+import numpy as np
+from pages.src.objectives import Quadratic, GOAL_BAND
+
+
+# DIAGNOSTICS:
+# cheap summaries of a run, computed in one vectorized pass over its Trajectory, so that the analysis
+# of the students' simulations never has to re-simulate them.
+# Outcomes, in the order of OUTCOMES:
+# - "converged": the last loss is inside the goal band
+# - "oscillated": the run went back and forth (a_{n+1} - a_n changes sign) at least at every other step
+# - "stalled": the run settled (its last step is tiny) outside of the goal band, e.g. in a local minimum, or none
+#   of the other outcomes applies, e.g. steps too small to get anywhere in max_iter iterations
+# - "diverged": an iterate is not finite, or the steps grow and the loss ends higher than it started
+# They are checked as diverged, converged, settled (stalled), oscillated, and anything left is stalled.
+
+# A run whose last step is smaller than this has settled
+SETTLED_STEP = 1e-4
+
+# Outcomes as small integer codes, for the arrays of diagnose_batch
+OUTCOMES = ("converged", "oscillated", "stalled", "diverged")
+
+def diagnose(trajectory, objective):
+    """Diagnostics record of a run on an objective, as a dict of plain Python values (ready to be saved as JSON)"""
+    a_ns, losses = trajectory.a_ns, trajectory.losses
+    n_iterations = len(trajectory)
+    finite = bool(np.all(np.isfinite(a_ns)))
+
+    with np.errstate(over='ignore', invalid='ignore'):
+        steps = np.diff(a_ns, axis=0)
+        if a_ns.ndim == 1:
+            step_sizes = np.abs(steps)
+            # going back and forth: two consecutive steps point in opposite directions
+            reversals = int(np.count_nonzero(steps[1:] * steps[:-1] < 0))
+            final_gradient_norm = abs(float(objective.grad_f(a_ns[-1])))
+        else:
+            step_sizes = np.linalg.norm(steps, axis=-1)
+            reversals = int(np.count_nonzero(np.sum(steps[1:] * steps[:-1], axis=-1) < 0))
+            # the N-dimensional quadratics take their point as one vector, the surfaces as coordinates
+            gradient = objective.grad_f(a_ns[-1]) if isinstance(objective, Quadratic) else objective.grad_f(*a_ns[-1])
+            final_gradient_norm = float(np.linalg.norm(gradient))
+
+    in_band = np.flatnonzero(losses <= GOAL_BAND)
+    growing = step_sizes.size > 1 and step_sizes[-1] > step_sizes[0] and losses[-1] > losses[0]
+    last_step = step_sizes[-1] if step_sizes.size else None
+
+    return {
+        'n_iterations': n_iterations,
+        'iteration_to_band': int(in_band[0]) if in_band.size else None,
+        'outcome': outcome_of(finite, growing, float(losses[-1]), last_step, n_iterations, reversals),
+        'direction_reversals': reversals,
+        'final_a': a_ns[-1].tolist(),
+        'final_loss': float(losses[-1]),
+        'final_gradient_norm': final_gradient_norm if np.isfinite(final_gradient_norm) else None,
+        'start_basin': basin_of(objective, a_ns[0]) if a_ns.ndim == 1 else None,
+        'basin': basin_of(objective, a_ns[-1]) if finite and a_ns.ndim == 1 else None,
+    }
+
+
+def outcome_of(finite, growing, final_loss, last_step, n_iterations, reversals):
+    """Outcome of a run from its summary, see the order of the checks above (last_step is None for a single point)"""
+    if not finite or growing:
+        return "diverged"
+    if final_loss <= GOAL_BAND:
+        return "converged"
+    if last_step is not None and last_step < SETTLED_STEP:
+        return "stalled"
+    if n_iterations > 2 and reversals >= (n_iterations - 2) / 2:
+        return "oscillated"
+    return "stalled"
+
+
+class RunningDiagnostics:
+    """diagnose for a 1D run fed one iterate at a time (e.g. by GradientDescent.iterate): only running counts and
+    the first and last iterates are kept, so arbitrarily long runs are diagnosed in constant memory"""
+    def __init__(self):
+        self.n_iterations = 0
+        self.iteration_to_band = None
+        self.reversals = 0
+        self.finite = True
+        self.a_0 = self.a_n = None
+        self.first_loss = self.loss = None
+        self.first_step = self.step = None
+
+    def add(self, a_n, loss):
+        if self.n_iterations == 0:
+            self.a_0, self.first_loss = a_n, loss
+        else:
+            step = a_n - self.a_n
+            if self.step is None:
+                self.first_step = step
+            elif step * self.step < 0:
+                self.reversals += 1
+            self.step = step
+        if self.iteration_to_band is None and loss <= GOAL_BAND:
+            self.iteration_to_band = self.n_iterations
+        self.finite = self.finite and bool(np.isfinite(a_n))
+        self.a_n, self.loss = a_n, loss
+        self.n_iterations += 1
+
+    def record(self, objective):
+        """Same record as diagnose would give for the whole run"""
+        with np.errstate(over='ignore', invalid='ignore'):
+            last_step = abs(self.step) if self.step is not None else None
+            growing = (self.n_iterations > 2 and abs(self.step) > abs(self.first_step)
+                       and self.loss > self.first_loss)
+            final_gradient_norm = abs(float(objective.grad_f(self.a_n)))
+        return {
+            'n_iterations': self.n_iterations,
+            'iteration_to_band': self.iteration_to_band,
+            'outcome': outcome_of(self.finite, growing, float(self.loss), last_step, self.n_iterations, self.reversals),
+            'direction_reversals': self.reversals,
+            'final_a': float(self.a_n),
+            'final_loss': float(self.loss),
+            'final_gradient_norm': final_gradient_norm if np.isfinite(final_gradient_norm) else None,
+            'start_basin': basin_of(objective, self.a_0),
+            'basin': basin_of(objective, self.a_n) if self.finite else None,
+        }
+
+
+def basin_of(objective, a):
+    """x of the local minimum of objective whose basin (the interval between the two surrounding local maxima)
+    contains a, looked up in the objective's stationary-point index"""
+    return float(objective.basin_minimum(a))
+
+
+def diagnose_batch(a_ns, losses):
+    """Vectorized diagnose for many 1D runs of the same length, given as (n_runs, n_iterations) arrays
+    (e.g. from GradientDescent.gradient_descent_batch). Returns three (n_runs,) arrays: the iteration at which
+    the loss first enters the goal band (-1 if never), the final loss and the outcome code (index in OUTCOMES)."""
+    n_iterations = a_ns.shape[1]
+    with np.errstate(over='ignore', invalid='ignore'):
+        finite = np.all(np.isfinite(a_ns), axis=1)
+        steps = np.diff(a_ns, axis=1)
+        step_sizes = np.abs(steps)
+        reversals = np.count_nonzero(steps[:, 1:] * steps[:, :-1] < 0, axis=1)
+        growing = (step_sizes[:, -1] > step_sizes[:, 0]) & (losses[:, -1] > losses[:, 0]) if n_iterations > 2 else False
+        in_band = losses <= GOAL_BAND
+        settled = step_sizes[:, -1] < SETTLED_STEP if n_iterations > 1 else False
+        oscillating = reversals >= (n_iterations - 2) / 2 if n_iterations > 2 else False
+
+    iteration_to_band = np.where(in_band.any(axis=1), np.argmax(in_band, axis=1), -1)
+    # same order of checks as in diagnose: the first matching condition wins
+    outcome = np.select(
+        [~finite | growing, in_band[:, -1], settled, oscillating],
+        [OUTCOMES.index("diverged"), OUTCOMES.index("converged"), OUTCOMES.index("stalled"), OUTCOMES.index("oscillated")],
+        default=OUTCOMES.index("stalled"))
+    return iteration_to_band, losses[:, -1], outcome
@@ -0,0 +1,496 @@
+from functools import lru_cache
+import numpy as np
+from sympy import Symbol, DiracDelta, Matrix, FiniteSet, Interval, Poly, diff, horner, expand, lambdify, latex, solveset, sympify
+
+
+# CATALOGUE:
+# convex functions we define and use for the PS activity
+# Each function is only written once, as a SymPy expression of x: its gradient and second derivative
+# are derived symbolically and everything is compiled into vectorized NumPy functions by compile_expression
+
+x_symbol = Symbol("x", real=True)
+y_symbol = Symbol("y", real=True)
+
+# Registry of the functions used in the PS activity, in the order they are shown to the students
+catalogue = {
+    # Shifted squared
+    "shifted_squared": "x**2 + 0.5*x",
+    # Oscillating square
+    "square_sin": "x ** 2 + 0.1 * sin(10 * x)",
+    # Absolute value, non-differentiable at 0 (its derivative is sign(x), and np.sign(0) = 0), see nonsmooth
+    "absolute": "abs(x)",
+    # Double valley - polynomial function that has 2 minima
+    "double_valley": "((x + 4) ** 4 - 15 * (x + 4) ** 3 + 80 * (x + 4) ** 2 - 180 * (x + 4) + 144) / 10",
+    #TODO: NB i am not sure using these 2 functions is a good idea, computing their loss function might be too confusing for the students
+    # # Cubic function: has no minima, either global nor minimum TODO: dangerous computation of its loss!!!
+    # "cube": "x ** 3",
+    # # Another cubic function that has no global minimum but a local one
+    # "deep_cubic": "x ** 3 - 4 * x",
+}
+
+# Functions of two variables (x, y) for the 2D mode, see GradientDescent2D
+catalogue_2d = {
+    # Round bowl: the gradient always points to the minimum
+    "bowl": "x**2 + y**2",
+    # Elongated bowl: badly conditioned, GD zigzags along the narrow direction
+    "elongated_bowl": "0.5 * x**2 + 4 * y**2 + 0.5 * x",
+    # Two valleys separated by a ridge along x = 0, the right one is deeper
+    "two_valleys": "(x**2 - 1)**2 - 0.3 * x + y**2",
+    # Rosenbrock's banana, its minimum lies at the bottom of a long curved valley
+    "banana": "(1 - x)**2 + 5 * (y - x**2)**2",
+}
+
+
+def soft_threshold(v, eta):
+    """Proximal operator of η|x|: v moved towards 0 by η, and exactly 0 if it is closer than that"""
+    return np.sign(v) * np.maximum(np.abs(v) - eta, 0)
+
+
+# Non-smooth functions of the catalogue, split into f = g + h with g smooth (an expression of x, compiled like the
+# catalogue) and h simple enough for its proximal operator prox_{ηh}(v) = argmin_u h(u) + (u - v)² / (2η) to have
+# a closed form, given as prox(v, η). See step_rules.ProximalGradient.
+nonsmooth = {
+    # |x| = 0 + |x|
+    "absolute": ("0", soft_threshold),
+}
+
+# Plotted window used by the PS activity
+DEFAULT_X_MIN = -2.5
+DEFAULT_X_MAX = 2.5
+
+# Half-width of the green goal band: a run has found the minimum once its loss is below GOAL_BAND
+GOAL_BAND = 0.05
+
+
+def kernel_form(expr, symbols=(x_symbol,)):
+    """The form of a SymPy expression that numpy_kernel compiles"""
+    # polynomials of one variable are cheapest to evaluate in Horner form
+    if len(symbols) == 1 and expr.free_symbols and expr.is_polynomial(*symbols):
+        return horner(expand(expr))
+    return expr
+
+
+def compile_kernel(expr, symbols=(x_symbol,)):
+    """Compile an expression already in kernel_form into a vectorized NumPy function"""
+    if not expr.free_symbols:
+        # lambdify would return a plain number for constant expressions, we want one value per input
+        value = float(expr)
+        return lambda *args: value + np.zeros(np.broadcast(*args).shape)
+    return lambdify(symbols, expr, modules="numpy", cse=True)
+
+
+def numpy_kernel(expr, symbols=(x_symbol,)):
+    """Compile a SymPy expression of x (or of the given symbols) into a vectorized NumPy function"""
+    return compile_kernel(kernel_form(expr, symbols), symbols)
+
+
+def numpy_vector_kernel(exprs, symbols):
+    """Compile a list of SymPy expressions into one vectorized function whose output is stacked on the first axis"""
+    kernels = [numpy_kernel(expr, symbols) for expr in exprs]
+    return lambda *args: np.stack(np.broadcast_arrays(*[kernel(*args) for kernel in kernels]))
+
+
+def check_derivative(f, df, expression, h=1e-6, rtol=1e-4):
+    """Compare a derived kernel df with central finite differences of f.
+    A few isolated disagreements are tolerated for functions with kinks (like |x| at 0)."""
+    x = np.linspace(DEFAULT_X_MIN + 0.05, DEFAULT_X_MAX - 0.05, 50)
+    finite_diff = (f(x + h) - f(x - h)) / (2 * h)
+    close = np.isclose(df(x), finite_diff, rtol=rtol, atol=1e3 * h)
+    if np.mean(close) < 0.9:
+        raise ValueError(f"The derivative of {expression} does not match its finite differences")
+
+
+def derive_forms(expr):
+    """kernel_form of f, its gradient and its second derivative, for a SymPy expression of x"""
+    grad = diff(expr, x_symbol)
+    # |x| has no second derivative at 0, we take 0 there instead of a Dirac
+    hess = diff(grad, x_symbol).replace(DiracDelta, lambda *args: 0)
+    return kernel_form(expr), kernel_form(grad), kernel_form(hess)
+
+
+def derive_kernels(expr, expression):
+    """Compiled f, gradient and second derivative of a SymPy expression of x, checked against finite differences"""
+    f, grad_f, hess_f = (compile_kernel(form) for form in derive_forms(expr))
+    check_derivative(f, grad_f, expression)
+    check_derivative(grad_f, hess_f, expression)
+    return f, grad_f, hess_f
+
+
+@lru_cache(maxsize=None)
+def compile_expression(expression):
+    """Parse a catalogue expression once and derive everything we need from it.
+    Returns the SymPy expression and the compiled f, gradient and second derivative."""
+    expr = sympify(expression, locals={"x": x_symbol})
+    return (expr,) + derive_kernels(expr, expression)
+
+
+@lru_cache(maxsize=None)
+def compile_expression_2d(expression):
+    """Same as compile_expression for functions of (x, y).
+    The gradient returns an array of shape (2, ...) and the Hessian one of shape (2, 2, ...)."""
+    symbols = (x_symbol, y_symbol)
+    expr = sympify(expression, locals={"x": x_symbol, "y": y_symbol})
+    grad = [diff(expr, v) for v in symbols]
+    hess = Matrix(2, 2, lambda i, j: diff(grad[i], symbols[j]))
+    f = numpy_kernel(expr, symbols)
+    grad_f = numpy_vector_kernel(grad, symbols)
+    hess_kernel = numpy_vector_kernel(list(hess), symbols)
+
+    def hess_f(x, y):
+        h = hess_kernel(x, y)
+        return h.reshape((2, 2) + h.shape[1:])
+
+    # check both partial derivatives against finite differences, one direction at a time
+    check_derivative(lambda t: f(t, 0.3), lambda t: grad_f(t, 0.3)[0], expression)
+    check_derivative(lambda t: f(0.3, t), lambda t: grad_f(0.3, t)[1], expression)
+    return expr, f, grad_f, hess_f
+
+
+def stationary_points(expression, X_MIN, X_MAX):
+    """Exact stationary points of an expression on [X_MIN, X_MAX] when SymPy can find them
+    (roots of a polynomial gradient, or a finite solution set), None otherwise"""
+    expr = compile_expression(expression)[0]
+    grad = diff(expr, x_symbol)
+    if grad.is_polynomial(x_symbol):
+        poly = Poly(grad, x_symbol)
+        if poly.is_zero:
+            # f is constant, every point is stationary: let the caller fall back to the grid
+            return np.empty(0)
+        # isolated exactly, so that repeated roots (e.g. of (x - 1)^4) don't come out a little off or complex
+        roots = np.array([float(root) for root in poly.real_roots()])
+        return roots[(roots >= X_MIN) & (roots <= X_MAX)]
+    solutions = solveset(grad, x_symbol, Interval(X_MIN, X_MAX))
+    if isinstance(solutions, FiniteSet):
+        return np.array([float(sol) for sol in solutions])
+    return None
+
+
+def golden_section_min(f, a, b, tol=1e-10):
+    """Refine the minimum of f on the bracket [a, b] (f is assumed unimodal there)"""
+    inv_phi = (np.sqrt(5) - 1) / 2
+    c, d = b - inv_phi * (b - a), a + inv_phi * (b - a)
+    while b - a > tol:
+        if f(c) < f(d):
+            b, d = d, c
+            c = b - inv_phi * (b - a)
+        else:
+            a, c = c, d
+            d = a + inv_phi * (b - a)
+    return (a + b) / 2
+
+
+def bisect_roots(g, a, b, n_iter=60):
+    """Vectorized bisection: roots of g in each bracket [a[i], b[i]], given that g changes sign on each of them"""
+    a, b = np.array(a, dtype=float), np.array(b, dtype=float)
+    g_a = g(a)
+    for _ in range(n_iter):
+        mid = (a + b) / 2
+        g_mid = g(mid)
+        left = np.sign(g_mid) == np.sign(g_a)
+        a, g_a = np.where(left, mid, a), np.where(left, g_mid, g_a)
+        b = np.where(left, b, mid)
+    return (a + b) / 2
+
+
+@lru_cache(maxsize=None)
+def stationary_index(expression, X_MIN, X_MAX, n_pts=500):
+    """Sorted x of all the local minima and of all the local maxima of an expression on [X_MIN, X_MAX],
+    computed once per process. Stationary points are exact when SymPy finds them, otherwise they are bracketed by
+    the sign changes of ∇f on a grid and refined by bisection. They are classified by the sign of ∇f halfway to
+    their neighbours, which also works at kinks like the one of |x| at 0 and at flat points like the one of
+    (x - 1)^4. The borders of the window count as minima when f goes down towards them, so that minima and maxima
+    alternate and every point belongs to the basin of exactly one minimum. When there is no minimum at all
+    (e.g. a constant), the lowest point of the grid is used, so that there is always at least one."""
+    f, grad_f = compile_expression(expression)[1:3]
+    points = stationary_points(expression, X_MIN, X_MAX)
+    if points is None:
+        x = np.linspace(X_MIN, X_MAX, n_pts)
+        g = grad_f(x)
+        brackets = np.flatnonzero(np.sign(g[:-1]) * np.sign(g[1:]) < 0)
+        points = np.r_[bisect_roots(grad_f, x[brackets], x[brackets + 1]), x[g == 0]]
+    points = np.unique(np.round(points, 12))
+
+    # sign of ∇f between each point and its neighbours (or the borders of the window)
+    bounds = np.r_[X_MIN, points, X_MAX]
+    slopes = np.sign(grad_f((bounds[:-1] + bounds[1:]) / 2))
+    left, right = slopes[:-1], slopes[1:]
+    minima = points[(left < 0) & (right > 0)]
+    maxima = points[(left > 0) & (right < 0)]
+    if grad_f(X_MIN) > 0 and (minima.size == 0 or minima[0] > X_MIN):
+        minima = np.r_[X_MIN, minima]
+    if grad_f(X_MAX) < 0 and (minima.size == 0 or minima[-1] < X_MAX):
+        minima = np.r_[minima, X_MAX]
+    if minima.size == 0:
+        x = np.linspace(X_MIN, X_MAX, n_pts)
+        minima = x[[np.argmin(f(x) + np.zeros_like(x))]]
+    minima.flags.writeable = False
+    maxima.flags.writeable = False
+    return minima, maxima
+
+
+@lru_cache(maxsize=None)
+def true_minimizer(expression, X_MIN, X_MAX, n_pts=500):
+    """x of the global minimum of an expression on [X_MIN, X_MAX], computed once per process and shared by all sessions:
+    the lowest of its local minima (see stationary_index)"""
+    f = compile_expression(expression)[1]
+    minima = stationary_index(expression, X_MIN, X_MAX, n_pts)[0]
+    return float(minima[np.argmin(f(minima))])
+
+
+class ReadOnly:
+    """Base class of the precomputed objects shared by all sessions: attributes are set once in __init__"""
+    __slots__ = ()
+
+    def _set(self, **attributes):
+        for attr, value in attributes.items():
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+            object.__setattr__(self, attr, value)
+
+    def __setattr__(self, attr, value):
+        raise AttributeError(f"{type(self).__name__} is read-only, cannot set {attr}")
+
+
+class Objective(ReadOnly):
+    """One function of the catalogue together with everything we need to display it on a given window.
+    Objectives are built once per process by get_objective and shared by all sessions, so they are read-only."""
+    __slots__ = ("name", "expression", "f", "grad_f", "hess_f", "latex", "X_MIN", "X_MAX", "x", "y", "y_min", "y_max",
+                 "true_min", "f_min", "minima", "f_minima", "maxima", "smooth_grad_f", "prox")
+
+    def __init__(self, name, X_MIN, X_MAX, n_pts):
+        expression = catalogue[name]
+        expr, f, grad_f, hess_f = compile_expression(expression)
+        # gradient of the smooth part and proximal operator of the rest (None for smooth functions), see nonsmooth
+        if name in nonsmooth:
+            smooth_expression, prox = nonsmooth[name]
+            smooth_grad_f = compile_expression(smooth_expression)[2]
+        else:
+            smooth_grad_f, prox = grad_f, None
+        x = np.linspace(X_MIN, X_MAX, n_pts)
+        y = f(x)
+        true_min = true_minimizer(expression, X_MIN, X_MAX, n_pts)
+        minima, maxima = stationary_index(expression, X_MIN, X_MAX, n_pts)
+        self._set(name=name, expression=expression, f=f, grad_f=grad_f, hess_f=hess_f, latex=latex(expr),
+                  X_MIN=X_MIN, X_MAX=X_MAX, x=x, y=y, y_min=float(y.min()), y_max=float(y.max()),
+                  true_min=true_min, f_min=float(f(true_min)), minima=minima, f_minima=f(minima), maxima=maxima,
+                  smooth_grad_f=smooth_grad_f, prox=prox)
+
+    def nearest_minimum(self, a):
+        return nearest_minimum(self, a)
+
+    def basin_minimum(self, a):
+        return basin_minimum(self, a)
+
+    def __repr__(self):
+        return f"Objective({self.name!r}, X_MIN={self.X_MIN}, X_MAX={self.X_MAX}, n_pts={self.x.size})"
+
+
+@lru_cache(maxsize=None)
+def get_objective(name, X_MIN=DEFAULT_X_MIN, X_MAX=DEFAULT_X_MAX, n_pts=500):
+    """The (cached) Objective of the catalogue function `name` sampled with n_pts points on [X_MIN, X_MAX]"""
+    return Objective(name, X_MIN, X_MAX, n_pts)
+
+
+@lru_cache(maxsize=None)
+def get_objectives(X_MIN=DEFAULT_X_MIN, X_MAX=DEFAULT_X_MAX, n_pts=500):
+    """All the Objectives of the catalogue, in order"""
+    return tuple(get_objective(name, X_MIN, X_MAX, n_pts) for name in catalogue)
+
+
+def catalogue_objective(name, X_MIN=DEFAULT_X_MIN, X_MAX=DEFAULT_X_MAX, n_pts=500):
+    """The Objective of `name` that GradientDescent works on (and whose grids share_catalogue maps from shared memory).
+    lru_cache keys depend on how the arguments are passed, so get_objective(name, X_MIN, X_MAX) would build a copy."""
+    return get_objectives(X_MIN, X_MAX, n_pts)[list(catalogue).index(name)]
+
+
+def nearest_minimum(objective, a):
+    """x of the local minimum of objective closest to a (vectorized over a), in O(log k) for k minima"""
+    minima = objective.minima
+    i = np.clip(np.searchsorted(minima, a), 1, max(minima.size - 1, 1))
+    left, right = minima[i - 1], minima[np.minimum(i, minima.size - 1)]
+    return np.where(np.abs(a - left) <= np.abs(right - a), left, right)
+
+
+def basin_minimum(objective, a):
+    """x of the local minimum whose basin of attraction (between the two surrounding maxima) contains a,
+    vectorized over a, in O(log k) for k maxima"""
+    return objective.minima[np.minimum(np.searchsorted(objective.maxima, a), objective.minima.size - 1)]
+
+
+class Surface(ReadOnly):
+    """2D counterpart of Objective: a function of (x, y) from catalogue_2d with its mesh over the square window
+    [X_MIN, X_MAX]², contour levels, a coarse gradient field and its minimum.
+    A mesh is far more expensive than a 1D curve, so surfaces are only built once per process by get_surface."""
+    __slots__ = ("name", "expression", "f", "grad_f", "hess_f", "latex", "X_MIN", "X_MAX", "x", "z", "z_min", "z_max",
+                 "levels", "field", "true_min", "f_min")
+
+    def __init__(self, name, X_MIN, X_MAX, n_pts, n_arrows=15):
+        expression = catalogue_2d[name]
+        expr, f, grad_f, hess_f = compile_expression_2d(expression)
+        x = np.linspace(X_MIN, X_MAX, n_pts)
+        X, Y = np.meshgrid(x, x)
+        z = f(X, Y)
+
+        # start from the best point of the mesh and polish it with a few Newton steps
+        i, j = np.unravel_index(np.argmin(z), z.shape)
+        true_min = np.array([x[j], x[i]])
+        for _ in range(20):
+            try:
+                step = np.linalg.solve(hess_f(*true_min), grad_f(*true_min))
+            except np.linalg.LinAlgError:
+                break
+            candidate = true_min - step
+            if not (np.all((candidate >= X_MIN) & (candidate <= X_MAX)) and f(*candidate) <= f(*true_min)):
+                break
+            true_min = candidate
+
+        # evenly spaced contour levels, concentrated on the low part of the surface where the action is
+        z_min = float(z.min())
+        top = float(np.quantile(z, 0.8))
+        levels = dict(start=z_min, end=top, size=(top - z_min) / 20)
+
+        # downhill directions -∇f on a coarse grid, normalised so that arrows have the same length
+        xq = np.linspace(X_MIN, X_MAX, n_arrows)
+        XQ, YQ = np.meshgrid(xq, xq)
+        u, v = -grad_f(XQ, YQ)
+        norm = np.hypot(u, v)
+        norm[norm == 0] = 1
+        field = np.stack([XQ, YQ, u / norm, v / norm])
+
+        self._set(name=name, expression=expression, f=f, grad_f=grad_f, hess_f=hess_f, latex=latex(expr),
+                  X_MIN=X_MIN, X_MAX=X_MAX, x=x, z=z, z_min=z_min, z_max=float(z.max()), levels=levels,
+                  field=field, true_min=true_min, f_min=float(f(*true_min)))
+
+    def __repr__(self):
+        return f"Surface({self.name!r}, X_MIN={self.X_MIN}, X_MAX={self.X_MAX}, n_pts={self.x.size})"
+
+
+@lru_cache(maxsize=None)
+def get_surface(name, X_MIN=DEFAULT_X_MIN, X_MAX=DEFAULT_X_MAX, n_pts=200):
+    """The (cached) Surface of the 2D catalogue function `name` on the mesh [X_MIN, X_MAX]² with n_pts² points"""
+    return Surface(name, X_MIN, X_MAX, n_pts)
+
+
+@lru_cache(maxsize=None)
+def get_surfaces(X_MIN=DEFAULT_X_MIN, X_MAX=DEFAULT_X_MAX, n_pts=200):
+    """All the Surfaces of the 2D catalogue, in order"""
+    return tuple(get_surface(name, X_MIN, X_MAX, n_pts) for name in catalogue_2d)
+
+
+# Quadratics in many dimensions, see Quadratic and GradientDescentND
+# Random reflections applied to the eigenbasis, enough to mix every coordinate
+N_REFLECTIONS = 3
+# A is updated in place this many rows at a time, so that building it needs no other dim×dim array
+ROW_BLOCK = 256
+
+
+def subtract_outer(M, x, y):
+    """M -= 2 x yᵀ in place, one block of rows at a time"""
+    for start in range(0, M.shape[0], ROW_BLOCK):
+        M[start:start + ROW_BLOCK] -= 2 * np.outer(x[start:start + ROW_BLOCK], y)
+
+
+def symmetrize(M):
+    """M ← (M + Mᵀ) / 2 in place, block by block (M + M.T would need two more copies of M)"""
+    for start in range(0, M.shape[0], ROW_BLOCK):
+        rows = slice(start, start + ROW_BLOCK)
+        for other in range(start, M.shape[0], ROW_BLOCK):
+            cols = slice(other, other + ROW_BLOCK)
+            block = (M[rows, cols] + M[cols, rows].T) / 2
+            M[rows, cols] = block
+            M[cols, rows] = block.T
+
+
+class Quadratic(ReadOnly):
+    """f(x) = ½ xᵀAx - bᵀx on R^dim, the textbook case for the effect of conditioning on gradient descent.
+    A is symmetric positive definite, with eigenvalues log-spaced between 1 and condition_number, in an eigenbasis
+    rotated by a few random Householder reflections (so that it isn't aligned with the axes).
+    f and grad_f take a point of shape (dim,) or a batch of shape (dim, k), one point per column, so that evaluating
+    them is a single matrix-vector or matrix-matrix product. A is stored dense: dim = 10⁴ takes 800 MB."""
+    __slots__ = ("name", "dim", "condition_number", "A", "b", "eigenvalues", "projection", "f", "grad_f", "hess_f",
+                 "latex", "true_min", "f_min")
+
+    def __init__(self, dim, condition_number, seed=0):
+        rng = np.random.default_rng(seed)
+        eigenvalues = np.logspace(0, np.log10(condition_number), dim)
+        reflections = rng.standard_normal((N_REFLECTIONS, dim))
+        reflections /= np.linalg.norm(reflections, axis=1, keepdims=True)
+
+        def rotate(M, transpose=False):
+            # Q M with Q = H_1 H_2 ... H_k (or Qᵀ M) for a vector or a few columns, each reflection H = I - 2vvᵀ
+            # costing one rank-1 update
+            for v in (reflections if transpose else reflections[::-1]):
+                M = M - 2 * np.outer(v, v @ M) if M.ndim == 2 else M - 2 * v * (v @ M)
+            return M
+
+        # A = Q diag(λ) Qᵀ = H_1 (... (H_k diag(λ) H_k) ...) H_1, every H M H being two in-place rank-1 updates
+        A = np.diag(eigenvalues)
+        for v in reflections[::-1]:
+            subtract_outer(A, v, v @ A)
+            subtract_outer(A, A @ v, v)
+        symmetrize(A)
+        # its minimum A⁻¹b = Q diag(1/λ) Qᵀ b needs no solve
+        b = rng.standard_normal(dim)
+        true_min = rotate(rotate(b, transpose=True) / eigenvalues)
+        # the eigenvectors of the smallest and largest eigenvalues: the slowest and fastest directions of GD
+        corners = np.zeros((dim, 2))
+        corners[0, 0] = corners[-1, 1] = 1
+        projection = rotate(corners)
+
+        def f(x):
+            return 0.5 * np.einsum("i...,i...->...", x, A @ x) - b @ x
+
+        def grad_f(x):
+            return A @ x - (b if x.ndim == 1 else b[:, None])
+
+        self._set(name=f"quadratic_{dim}d", dim=dim, condition_number=float(condition_number), A=A, b=b,
+                  eigenvalues=eigenvalues, projection=projection, f=f, grad_f=grad_f, hess_f=lambda x: A,
+                  latex=r"\frac{1}{2} x^\top A x - b^\top x, \quad x \in \mathbb{R}^{%d}, \ \kappa(A) = %g" % (dim, condition_number),
+                  true_min=true_min, f_min=float(-0.5 * b @ true_min))
+
+    @property
+    def L(self):
+        """Largest curvature: gradient descent converges for η < 2 / L"""
+        return float(self.eigenvalues[-1])
+
+    @property
+    def mu(self):
+        """Smallest curvature"""
+        return float(self.eigenvalues[0])
+
+    def project(self, x):
+        """Coordinates of points (shape (..., dim)) around the minimum, along the slowest and fastest directions"""
+        return (np.asarray(x) - self.true_min) @ self.projection
+
+    def __repr__(self):
+        return f"Quadratic(dim={self.dim}, condition_number={self.condition_number:g})"
+
+
+# A single matrix can weigh hundreds of MB, only keep the last one
+@lru_cache(maxsize=1)
+def get_quadratic(dim, condition_number=10.0, seed=0):
+    """The (cached) Quadratic of dimension dim with the given condition number"""
+    return Quadratic(dim, condition_number, seed)
+
+
+# LaTeX, grids and minima of the catalogue on the default window, computed at import
+get_objectives()
+
+
+if __name__ == "__main__":
+    # regression checks of the stationary-point index: python -m pages.src.objectives
+    # (expression, minima, maxima) on the default window
+    cases = [
+        ("(x - 1)**4", [1.0], []),         # repeated root of ∇f
+        ("5", [DEFAULT_X_MIN], []),          # constant: no stationary point, the grid gives one
+        ("x**3", [DEFAULT_X_MIN], []),       # flat inflection point, not a minimum
+        ("-(x - 1)**4", [DEFAULT_X_MIN, DEFAULT_X_MAX], [1.0]),
+        ("abs(x)", [0.0], []),               # kink
+        ("(x**2 - 1)**2", [-1.0, 1.0], [0.0]),
+    ]
+    for expression, minima, maxima in cases:
+        found = stationary_index(expression, DEFAULT_X_MIN, DEFAULT_X_MAX)
+        assert np.allclose(found[0], minima) and np.allclose(found[1], maxima), (expression, found)
+    for name in catalogue:
+        assert catalogue_objective(name).minima.size > 0, name
+    print(f"{len(cases)} stationary-point checks passed")
@@ -0,0 +1,84 @@
+from functools import lru_cache
+import numpy as np
+from pages.src.objectives import catalogue_objective, ReadOnly, DEFAULT_X_MIN, DEFAULT_X_MAX
+from pages.src.GradientDescent import gradient_descent_batch, a0_options, eta_options
+from pages.src.diagnostics import diagnose_batch, OUTCOMES
+
+
+# STEP-SIZE ORACLE:
+# for every starting point a student can pick, the learning rates of the η slider that work best, found once per
+# process with one vectorized sweep of the whole (a₀, η) grid, plus the classical bound η < 2 / L where L is the
+# largest curvature |f''| between a₀ and the minimum of its basin. Lookups are a rounding and an index.
+
+# Runs of the sweep are as long as the ones of the activity (GradientDescent's max_iter by default): a hint must be
+# reachable by a student who follows it
+ORACLE_MAX_ITER = 15
+# Number of points where the curvature is sampled between a₀ and its basin minimum
+CURVATURE_PTS = 64
+
+
+class StepSizeOracle(ReadOnly):
+    """Best learning rates of the slider for every starting point of the activity on one catalogue function,
+    judged on runs of max_iter iterations (the ones the student sees)"""
+    __slots__ = ("name", "a0s", "etas", "fastest_eta", "iterations_to_band", "largest_eta", "stable_bound")
+
+    def __init__(self, name, X_MIN, X_MAX, ETA_MIN, ETA_MAX, max_iter=ORACLE_MAX_ITER):
+        objective = catalogue_objective(name, X_MIN, X_MAX)
+        a0s = np.array(a0_options(X_MIN, X_MAX))
+        etas = np.array(eta_options(ETA_MIN, ETA_MAX))
+        a_ns, losses = gradient_descent_batch(objective.f, objective.grad_f, a0s[:, None], etas[None, :],
+                                              max_iter, objective.f_min)
+        iteration_to_band, final_loss, outcome = (field.reshape(a0s.size, etas.size) for field in diagnose_batch(a_ns, losses))
+        converged = outcome == OUTCOMES.index("converged")
+
+        # fastest: fewest iterations to the band, ties broken by the lowest final loss
+        iterations = np.where(converged, iteration_to_band, max_iter)
+        quickest = converged & (iterations == iterations.min(axis=1, keepdims=True))
+        fastest = np.argmin(np.where(quickest, final_loss, np.inf), axis=1)
+        any_converged = converged.any(axis=1)
+        # largest: the last η of the slider whose run still converges
+        largest = etas.size - 1 - np.argmax(converged[:, ::-1], axis=1)
+
+        # curvature between a₀ and the minimum of its basin
+        t = np.linspace(0, 1, CURVATURE_PTS)
+        minima = objective.basin_minimum(a0s)
+        segment = a0s[:, None] + t[None, :] * (minima - a0s)[:, None]
+        L = np.abs(objective.hess_f(segment)).max(axis=1)
+        with np.errstate(divide='ignore'):
+            stable_bound = np.where(L > 0, 2 / L, np.inf)
+
+        self._set(name=name, a0s=a0s, etas=etas,
+                  fastest_eta=np.where(any_converged, etas[fastest], np.nan),
+                  iterations_to_band=np.where(any_converged, iterations[np.arange(a0s.size), fastest], -1),
+                  largest_eta=np.where(any_converged, etas[largest], np.nan),
+                  stable_bound=stable_bound)
+
+    def index(self, a_0):
+        """Index of the closest starting point of the grid (evenly spaced), in O(1)"""
+        i = round((a_0 - self.a0s[0]) / (self.a0s[-1] - self.a0s[0]) * (self.a0s.size - 1))
+        return min(max(i, 0), self.a0s.size - 1)
+
+    def query(self, a_0):
+        """Learning rates for a₀, as a dict of plain Python values (None when no η of the slider reaches the goal band
+        within max_iter iterations):
+        - fastest_eta: the η of the slider that reaches the goal band in the fewest iterations (iterations_to_band)
+        - largest_eta: the largest η of the slider that still converges
+        - stable_bound: 2 / L, with L the largest |f''| between a₀ and its basin minimum (None if f is flat there)"""
+        i = self.index(a_0)
+        converges = bool(np.isfinite(self.fastest_eta[i]))
+        return {
+            'a_0': float(self.a0s[i]),
+            'fastest_eta': float(self.fastest_eta[i]) if converges else None,
+            'iterations_to_band': int(self.iterations_to_band[i]) if converges else None,
+            'largest_eta': float(self.largest_eta[i]) if converges else None,
+            'stable_bound': float(self.stable_bound[i]) if np.isfinite(self.stable_bound[i]) else None,
+        }
+
+    def __repr__(self):
+        return f"StepSizeOracle({self.name!r}, {self.a0s.size} starting points x {self.etas.size} learning rates)"
+
+
+@lru_cache(maxsize=None)
+def get_oracle(name, X_MIN=DEFAULT_X_MIN, X_MAX=DEFAULT_X_MAX, ETA_MIN=0.001, ETA_MAX=100.0, max_iter=ORACLE_MAX_ITER):
+    """The (cached) step-size oracle of a catalogue function, for runs of max_iter iterations"""
+    return StepSizeOracle(name, X_MIN, X_MAX, ETA_MIN, ETA_MAX, max_iter)
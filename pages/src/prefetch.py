@@ -0,0 +1,62 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pages.src.objectives import catalogue, catalogue_objective
+from pages.src.GradientDescent import change_every, naked_figure
+from pages.src.oracle import get_oracle
+from pages.src.atlas import get_atlas
+
+
+# PREFETCH:
+# the function of the PS activity only depends on the simulation counter (it changes every change_every simulations),
+# so the next one is known in advance. When a session gets close to a switch, the lazily built assets of the next
+# function (its base figure, step-size oracle, pages of the atlas) are warmed in a background thread, so that the
+# rerun where the mountain changes costs no more than any other one.
+
+# How many simulations before a switch we start warming the next function
+PREFETCH_LEAD = 1
+
+
+class Prefetcher:
+    """Small thread pool running warm-up tasks in the background, shared by all the sessions of the process.
+    A task is only submitted once per key (again if it failed), however many sessions ask for it."""
+
+    def __init__(self, max_workers=2):
+        self.pool = ThreadPoolExecutor(max_workers, thread_name_prefix="prefetch")
+        self.tasks = {}
+        self.lock = threading.Lock()
+
+    def submit(self, key, fn, *args):
+        with self.lock:
+            task = self.tasks.get(key)
+            if task is None or (task.done() and task.exception() is not None):
+                task = self.tasks[key] = self.pool.submit(fn, *args)
+        return task
+
+
+def upcoming_functions(sim_counter, lead=PREFETCH_LEAD):
+    """Names of the catalogue functions the next `lead` simulations will switch to (none if far from a switch)"""
+    names = list(catalogue)
+    current = (sim_counter // change_every) % len(names)
+    return [names[f_idx] for f_idx in {((sim_counter + k) // change_every) % len(names) for k in range(1, lead + 1)}
+            if f_idx != current]
+
+
+def warm_function(name, X_MIN, X_MAX, ETA_MIN, ETA_MAX, oracle=False, atlas=False, n_pts=500, max_iter=15):
+    """Build (and cache) what the activity needs to show a catalogue function"""
+    naked_figure(catalogue_objective(name, X_MIN, X_MAX, n_pts))
+    if oracle:
+        get_oracle(name, X_MIN, X_MAX, ETA_MIN, ETA_MAX, max_iter)
+    if atlas:
+        function_atlas = get_atlas(name)
+        if function_atlas is not None:
+            # read the rows of the heatmap once, so that they are in the page cache when it is drawn
+            function_atlas.plot_heatmap()
+
+
+def prefetch_next_functions(prefetcher, sim_counter, X_MIN, X_MAX, ETA_MIN, ETA_MAX, oracle=False, atlas=False):
+    """Warm the upcoming functions in the background, returns the names of the functions being warmed"""
+    names = upcoming_functions(sim_counter)
+    for name in names:
+        prefetcher.submit((name, X_MIN, X_MAX, ETA_MIN, ETA_MAX, oracle, atlas), warm_function,
+                          name, X_MIN, X_MAX, ETA_MIN, ETA_MAX, oracle, atlas)
+    return names
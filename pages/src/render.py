@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+from pages.src.objectives import catalogue, catalogue_objective, GOAL_BAND, DEFAULT_X_MIN, DEFAULT_X_MAX
+from pages.src.GradientDescent import GradientDescent
+from pages.src.trajectory import Trajectory
+
+
+# OFFLINE ANIMATIONS:
+# the same view as GradientDescent.plot_iterations_and_loss (f(x) with the iterates on the left, the loss on the right)
+# rendered with matplotlib into GIF / MP4 / PNG-strip files for videos and slides, without a browser.
+# The static part of the figure is drawn once; every frame only restores it and draws the moving points, labels and
+# loss curve on top (blitting). Frames, or whole animations for batches, are drawn in a process pool.
+#
+# python -m pages.src.render jobs.json --output animations/
+# with jobs.json a list of {"function": "double_valley", "a_0": -1.5, "eta": 0.1, "max_iter": 15, "format": "gif"}
+
+# Frames per row of a PNG strip
+STRIP_COLUMNS = 5
+
+
+class FrameRenderer:
+    """Draws the frames of one run, frame i showing the iterates a_0, ..., a_i and their losses"""
+
+    def __init__(self, objective, trajectory, goal, max_iter, size=(10, 4), dpi=100):
+        self.trajectory = trajectory
+        self.fig = Figure(figsize=size, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        ax_path, ax_loss = self.fig.subplots(1, 2)
+        goal_x, goal_f = goal
+
+        # ===== static part, drawn once =====
+        ax_path.set_title("Gradient Descent Path")
+        ax_path.plot(objective.x, objective.y, color="lightgray")
+        ax_path.axhspan(goal_f - GOAL_BAND, goal_f + GOAL_BAND, color=(144/255, 238/255, 144/255, 0.3), linewidth=0)
+        ax_path.plot([goal_x], [goal_f], "o", markersize=7, markerfacecolor=(144/255, 238/255, 144/255, 0.5),
+                     markeredgecolor="lightgreen")
+        ax_path.set_xlim(objective.X_MIN, objective.X_MAX)
+        ax_path.set_ylim(objective.y_min, objective.y_max)
+
+        ax_loss.set_title("Loss Curve")
+        ax_loss.axhspan(0, GOAL_BAND, color=(144/255, 238/255, 144/255, 0.3), linewidth=0)
+        ax_loss.set_xlim(-1, max(max_iter, len(trajectory)))
+        ax_loss.set_ylim(-0.1, trajectory.max_finite_loss() + 0.1)
+
+        # ===== moving part, only drawn in frame() =====
+        self.points, = ax_path.plot([], [], "o", color="red", markersize=6, animated=True)
+        self.labels = [ax_path.annotate(f"a{n}", (a_n, f_a_n), xytext=(6, 4), textcoords="offset points",
+                                        color="darkred", fontsize=9, animated=True, clip_on=True)
+                       for n, (a_n, f_a_n) in enumerate(zip(trajectory.a_ns.tolist(), trajectory.f_a_ns.tolist()))]
+        self.loss_line, = ax_loss.plot([], [], "o-", color="red", markersize=5, animated=True)
+        self.axes = ax_path, ax_loss
+
+        self.fig.tight_layout()
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def frame(self, i):
+        """RGB array of frame i"""
+        self.canvas.restore_region(self.background)
+        shown = self.trajectory.prefix(i + 1)
+        self.points.set_data(shown.a_ns, shown.f_a_ns)
+        self.loss_line.set_data(shown.iterations, shown.losses)
+        ax_path, ax_loss = self.axes
+        ax_path.draw_artist(self.points)
+        for label, a_n in zip(self.labels[:i + 1], shown.a_ns):
+            if np.isfinite(a_n):
+                ax_path.draw_artist(label)
+        ax_loss.draw_artist(self.loss_line)
+        return np.asarray(self.canvas.buffer_rgba())[..., :3].copy()
+
+
+def _render_range(name, X_MIN, X_MAX, arrays, goal, max_iter, start, stop, size, dpi):
+    """Frames start to stop - 1 of a run on a catalogue function (in a worker process)"""
+    renderer = FrameRenderer(catalogue_objective(name, X_MIN, X_MAX), Trajectory(*arrays), goal, max_iter, size, dpi)
+    return [renderer.frame(i) for i in range(start, stop)]
+
+
+def render_frames(GD, processes=1, size=(10, 4), dpi=100):
+    """All the frames of the last run of GD. With processes > 1 (catalogue functions only), contiguous ranges of
+    frames are drawn by different processes, each one drawing its own static background once."""
+    trajectory = GD.trajectory
+    goal = GD.goal_minimum()
+    n_frames = len(trajectory)
+    if processes == 1:
+        renderer = FrameRenderer(GD.objective, trajectory, goal, GD.max_iter, size, dpi)
+        return [renderer.frame(i) for i in range(n_frames)]
+
+    assert GD.objective.name in catalogue, "Only catalogue functions can be rendered in parallel, use processes=1"
+    processes = processes or os.cpu_count() or 1
+    bounds = np.linspace(0, n_frames, min(processes, n_frames) + 1).astype(int)
+    arrays = (trajectory.a_ns, trajectory.f_a_ns, trajectory.losses)
+    with ProcessPoolExecutor(processes) as pool:
+        tasks = [pool.submit(_render_range, GD.objective.name, GD.X_MIN, GD.X_MAX, arrays, goal, GD.max_iter,
+                             start, stop, size, dpi)
+                 for start, stop in zip(bounds[:-1], bounds[1:])]
+        return [frame for task in tasks for frame in task.result()]
+
+
+def write_frames(frames, path, fps=2):
+    """Save frames as an animated .gif, an .mp4 (needs ffmpeg) or a .png strip (STRIP_COLUMNS frames per row)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".gif":
+        # one shared palette, taken from the last frame (it contains every color of the animation)
+        palette = Image.fromarray(frames[-1]).quantize(colors=64, method=Image.Quantize.FASTOCTREE)
+        images = [Image.fromarray(frame).quantize(palette=palette, dither=Image.Dither.NONE) for frame in frames]
+        images[0].save(path, save_all=True, append_images=images[1:], duration=int(1000 / fps), loop=0)
+    elif extension == ".png":
+        height, width, _ = frames[0].shape
+        n_rows = -(-len(frames) // STRIP_COLUMNS)
+        strip = np.full((n_rows * height, min(len(frames), STRIP_COLUMNS) * width, 3), 255, dtype=np.uint8)
+        for k, frame in enumerate(frames):
+            row, col = divmod(k, STRIP_COLUMNS)
+            strip[row * height:(row + 1) * height, col * width:(col + 1) * width] = frame
+        Image.fromarray(strip).save(path)
+    elif extension == ".mp4":
+        ffmpeg = shutil.which(matplotlib.rcParams["animation.ffmpeg_path"])
+        assert ffmpeg is not None, "ffmpeg is needed to write .mp4 files, please install it or use .gif / .png"
+        height, width, _ = frames[0].shape
+        command = [ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+                   "-r", str(fps), "-i", "-", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p", path]
+        subprocess.run(command, input=b"".join(frame.tobytes() for frame in frames), check=True)
+    else:
+        raise ValueError(f"Unknown animation format {extension}, please use .gif, .mp4 or .png")
+
+
+def render(GD, path, fps=2, processes=1, size=(10, 4), dpi=100):
+    """Render the last run of GD (see GradientDescent.gradient_descent) into an animation file"""
+    assert GD.trajectory is not None, "Please run the algorithm before rendering it."
+    write_frames(render_frames(GD, processes, size, dpi), path, fps)
+    return path
+
+
+def render_job(job, directory, X_MIN=DEFAULT_X_MIN, X_MAX=DEFAULT_X_MAX):
+    """Simulate and render one {"function", "a_0", "eta", "max_iter", "format"} job, as in the PS activity"""
+    GD = GradientDescent(X_MIN, X_MAX, 0, max_iter=job.get("max_iter", 15))
+    GD.set_objective(catalogue_objective(job["function"], X_MIN, X_MAX))
+    GD.set_a_0(job["a_0"])
+    GD.set_eta(job["eta"])
+    GD.gradient_descent(tol=1e-6, blowup=1e6)
+    path = os.path.join(directory, f"{job['function']}_a0={job['a_0']}_eta={job['eta']}.{job.get('format', 'gif')}")
+    return render(GD, path, fps=job.get("fps", 2))
+
+
+def render_batch(jobs, directory, processes=None):
+    """Render many animations, one per process at a time. Returns the paths of the files, in the order of jobs."""
+    os.makedirs(directory, exist_ok=True)
+    if processes == 1:
+        return [render_job(job, directory) for job in jobs]
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(render_job, jobs, [directory] * len(jobs)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render gradient descent runs into animation files")
+    parser.add_argument("jobs", help="JSON list of {function, a_0, eta[, max_iter, format, fps]}")
+    parser.add_argument("--output", required=True, help="directory of the animations")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    with open(args.jobs, "r") as f:
+        jobs = json.load(f)
+    paths = render_batch(jobs, args.output, args.processes)
+    print(f"{len(paths)} animations written to {args.output}")
@@ -0,0 +1,168 @@
+import atexit
+import hashlib
+import json
+import os
+import sys
+import time
+import numpy as np
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+
+# SHARED-MEMORY CACHE:
+# st.cache_resource is per process, so when the app runs as several Streamlit processes on one machine each of them
+# would hold its own copy of the catalogue grids and of the trajectory tables. Here the first process to need a
+# group of arrays publishes them in a named shared memory block, and the other processes map that block instead
+# (zero copy, read-only). The block lives as long as the process that published it: if it goes away, the next
+# process that misses it publishes it again. A block left half-written by a publisher that died is removed and
+# published again by the first process that finds it.
+#
+# Layout of a block: 8 bytes with the length of the JSON header (0 until the block is complete), 8 bytes with the
+# pid of the publisher, the header {"arrays": [[name, dtype, shape, offset], ...]}, then the arrays themselves,
+# each aligned on ALIGNMENT bytes (offsets are counted from the first array).
+
+HEADER_SIZE = 16
+ALIGNMENT = 64
+# how long to wait for a block that another (living) process is still filling before replacing it
+WAIT_SECONDS = 30.0
+
+# The SharedMemory objects must stay open as long as their arrays are used
+_blocks = {}
+# names of the blocks published by this process
+_published = set()
+
+
+def block_name(key):
+    """Short name of the shared memory block of a cache key (POSIX names can't be long)"""
+    return "gd_" + hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+
+
+def _attach(name):
+    # the resource tracker would unlink the block when this process exits, it is not ours to remove
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    shm = SharedMemory(name=name)
+    if os.name == "posix":
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _unlink_stale(shm):
+    """Remove a block we attached to (and whose publisher is gone)"""
+    if sys.version_info < (3, 13) and os.name == "posix":
+        # unlink unregisters the block from the resource tracker, which _attach already did
+        resource_tracker.register(shm._name, "shared_memory")
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass # someone else removed it first
+    shm.close()
+
+
+def _publisher_alive(shm):
+    pid = int(np.frombuffer(shm.buf, dtype=np.uint64, count=2)[1])
+    if pid == 0:
+        return True # not written yet, the publisher has only just created the block
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass # it exists, it just isn't ours
+    return True
+
+
+def _data_start(header_size):
+    return -(-(HEADER_SIZE + header_size) // ALIGNMENT) * ALIGNMENT
+
+
+def _views(shm):
+    """Read-only arrays of a complete block, or None if it is still being filled"""
+    header_size = int(np.frombuffer(shm.buf, dtype=np.uint64, count=1)[0])
+    if header_size == 0:
+        return None
+    header = json.loads(bytes(shm.buf[HEADER_SIZE:HEADER_SIZE + header_size]))
+    start = _data_start(header_size)
+    arrays = {}
+    for name, dtype, shape, offset in header["arrays"]:
+        array = np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=shm.buf, offset=start + offset)
+        array.flags.writeable = False
+        arrays[name] = array
+    return arrays
+
+
+def _publish(name, arrays):
+    """Create the block of a dict of arrays, or return None if another process created it first"""
+    entries, offset = [], 0
+    for array_name, array in arrays.items():
+        entries.append([array_name, array.dtype.str, list(array.shape), offset])
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps({"arrays": entries}).encode()
+    start = _data_start(len(header))
+
+    try:
+        shm = SharedMemory(name=name, create=True, size=start + offset)
+    except FileExistsError:
+        return None
+    np.ndarray((2,), dtype=np.uint64, buffer=shm.buf)[1] = os.getpid()
+    for array_name, dtype, shape, array_offset in entries:
+        np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=shm.buf, offset=start + array_offset)[...] = arrays[array_name]
+    shm.buf[HEADER_SIZE:HEADER_SIZE + len(header)] = header
+    # marking the block as complete comes last
+    np.ndarray((1,), dtype=np.uint64, buffer=shm.buf)[0] = len(header)
+    return shm
+
+
+def shared_arrays(key, build):
+    """Read-only views on the arrays of a cache key, shared by all the processes of the machine.
+    build() returns a dict {name: array} and is only called by a process that doesn't find the block."""
+    name = block_name(key)
+    if name in _blocks:
+        return _views(_blocks[name])
+
+    built = None
+    # a second attempt is only needed after removing a block whose publisher died
+    for _ in range(2):
+        try:
+            shm = _attach(name)
+        except FileNotFoundError:
+            built = build() if built is None else built
+            shm = _publish(name, {array_name: np.ascontiguousarray(array) for array_name, array in built.items()})
+            if shm is None:
+                # another process published it in the meantime
+                shm = _attach(name)
+            else:
+                _published.add(name)
+
+        deadline = time.monotonic() + WAIT_SECONDS
+        while (arrays := _views(shm)) is None:
+            if time.monotonic() > deadline or not _publisher_alive(shm):
+                break
+            time.sleep(0.05)
+        else:
+            _blocks[name] = shm
+            return arrays
+        # the publisher died (or got stuck) before filling the block: replace it for everybody
+        _unlink_stale(shm)
+    # still no complete block, we keep our own copy
+    return build() if built is None else built
+
+
+def share_grids(key, objects):
+    """Replace the NumPy attributes of read-only precomputed objects (objectives.Objective, objectives.Surface...)
+    by views on shared memory, so that every process maps the same grids instead of keeping its own"""
+    def build():
+        return {f"{i}.{attr}": getattr(obj, attr) for i, obj in enumerate(objects)
+                for attr in type(obj).__slots__ if isinstance(getattr(obj, attr, None), np.ndarray)}
+    arrays = shared_arrays(key, build)
+    for array_name, array in arrays.items():
+        i, attr = array_name.split(".", 1)
+        objects[int(i)]._set(**{attr: array})
+    return objects
+
+
+@atexit.register
+def _unlink_published():
+    # the processes that still map these blocks keep them, new ones will publish them again
+    for name in _published:
+        _blocks[name].unlink()
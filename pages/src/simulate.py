@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from pages.src.objectives import catalogue, catalogue_objective, DEFAULT_X_MIN, DEFAULT_X_MAX
+from pages.src.GradientDescent import gradient_descent_batch
+from pages.src.step_rules import StepRule, all_step_rules, run_step_rule
+from pages.src.diagnostics import diagnose_batch, OUTCOMES
+
+
+# HEADLESS BATCH SIMULATIONS:
+# python -m pages.src.simulate params.json --output runs.parquet
+# runs every (function, a₀, η) of a parameter file through the vectorized recurrence, in parallel blocks, and
+# streams the results chunk by chunk (one Parquet row group, or one .npz file, per chunk) without Streamlit.
+#
+# Parameter file (JSON), every field is optional:
+# {
+#     "functions": ["shifted_squared", "double_valley"],           (default: the whole catalogue)
+#     "a0s": [-1.5, 0.7] or {"start": -2.5, "stop": 2.5, "num": 1001},
+#     "etas": [0.1, 1.0] or {"start": 0.001, "stop": 100, "num": 401, "log": true},
+#     "max_iter": 15,
+#     "step_rule": "Momentum",                                       (default: plain gradient descent)
+#     "X_MIN": -2.5, "X_MAX": 2.5
+# }
+
+# Number of runs simulated (and written) together
+CHUNK_RUNS = 1 << 18
+
+
+def parameter_values(spec):
+    """A list of values, or a {"start", "stop", "num", "log"} range (log-spaced if "log" is true)"""
+    if isinstance(spec, dict):
+        if spec.get("log", False):
+            return np.logspace(np.log10(spec["start"]), np.log10(spec["stop"]), spec["num"])
+        return np.linspace(spec["start"], spec["stop"], spec["num"])
+    return np.asarray(spec, dtype=float)
+
+
+def read_parameters(path):
+    with open(path, "r") as f:
+        params = json.load(f)
+    step_rules = {step_rule.name: step_rule for step_rule in all_step_rules}
+    step_rule = params.get("step_rule", StepRule().name)
+    assert step_rule in step_rules, f"Unknown step rule {step_rule}, please use one of {list(step_rules)}"
+    functions = params.get("functions", list(catalogue))
+    unknown = [name for name in functions if name not in catalogue]
+    assert not unknown, f"Unknown functions {unknown}, please use names of the catalogue {list(catalogue)}"
+    return {
+        "functions": functions,
+        "a0s": parameter_values(params.get("a0s", [-1.5, -0.7, 0.7, 1.5])),
+        "etas": parameter_values(params.get("etas", {"start": 0.001, "stop": 100, "num": 21, "log": True})),
+        "max_iter": int(params.get("max_iter", 15)),
+        "step_rule": step_rules[step_rule],
+        "X_MIN": params.get("X_MIN", DEFAULT_X_MIN),
+        "X_MAX": params.get("X_MAX", DEFAULT_X_MAX),
+    }
+
+
+def simulate_block(name, X_MIN, X_MAX, a0s, etas, max_iter, step_rule, trajectories=False):
+    """Runs of one function from a block of starting points against all the learning rates, in (a₀, η) row-major
+    order. Returns a dict of columns, with the full iterates and losses if trajectories is True."""
+    objective = catalogue_objective(name, X_MIN, X_MAX)
+    if type(step_rule) is StepRule:
+        a_ns, losses = gradient_descent_batch(objective.f, objective.grad_f, a0s[:, None], etas[None, :], max_iter,
+                                              objective.f_min)
+    else:
+        a_ns, losses = run_step_rule(objective, step_rule, a0s[:, None], etas[None, :], max_iter)[:2]
+    iteration_to_band, final_loss, outcome = diagnose_batch(a_ns, losses)
+    columns = {
+        "function": np.full(a_ns.shape[0], list(catalogue).index(name), dtype=np.int8),
+        "a_0": np.repeat(a0s, etas.size),
+        "eta": np.tile(etas, a0s.size),
+        "iteration_to_band": iteration_to_band.astype(np.int16),
+        "final_loss": final_loss,
+        "outcome": outcome.astype(np.int8),
+    }
+    if trajectories:
+        columns.update(a_ns=a_ns, losses=losses)
+    return columns
+
+
+def blocks(params, chunk_runs=CHUNK_RUNS):
+    """Arguments of simulate_block for every chunk of about chunk_runs runs"""
+    rows = max(1, chunk_runs // params["etas"].size)
+    for name in params["functions"]:
+        for start in range(0, params["a0s"].size, rows):
+            yield (name, params["X_MIN"], params["X_MAX"], params["a0s"][start:start + rows], params["etas"],
+                   params["max_iter"], params["step_rule"])
+
+
+def run_blocks(params, trajectories=False, processes=None, chunk_runs=CHUNK_RUNS):
+    """Yield the columns of simulate_block chunk by chunk, in order. With more than one process, at most two chunks
+    per process are in flight, so memory stays bounded however many runs are asked for."""
+    if processes == 1:
+        for args in blocks(params, chunk_runs):
+            yield simulate_block(*args, trajectories)
+        return
+    max_in_flight = 2 * (processes or os.cpu_count() or 1)
+    with ProcessPoolExecutor(processes) as pool:
+        in_flight = deque()
+        for args in blocks(params, chunk_runs):
+            in_flight.append(pool.submit(simulate_block, *args, trajectories))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+class NpzWriter:
+    """One part-XXXXX.npz file per chunk in the output directory"""
+
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.n_chunks = 0
+        # how to decode the integer columns
+        with open(os.path.join(path, "codes.json"), "w") as f:
+            json.dump({"function": list(catalogue), "outcome": list(OUTCOMES)}, f)
+
+    def write(self, columns):
+        np.savez(os.path.join(self.path, f"part-{self.n_chunks:05d}.npz"), **columns)
+        self.n_chunks += 1
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    """One row group per chunk in a single Parquet file (pyarrow is only needed here).
+    function and outcome are dictionary-encoded, the trajectories are fixed-size lists."""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.writer = None
+
+    def write(self, columns):
+        pa = self.pa
+        arrays = {}
+        for name, column in columns.items():
+            if name in ("function", "outcome"):
+                codes = list(catalogue) if name == "function" else list(OUTCOMES)
+                arrays[name] = pa.DictionaryArray.from_arrays(column, codes)
+            elif column.ndim == 2:
+                arrays[name] = pa.FixedSizeListArray.from_arrays(pa.array(column.ravel()), column.shape[1])
+            else:
+                arrays[name] = pa.array(column)
+        table = pa.table(arrays)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def simulate(params, output, trajectories=False, processes=None, chunk_runs=CHUNK_RUNS):
+    """Run all the simulations of params and stream them to output (.parquet file, or else a directory of .npz chunks).
+    Returns the number of runs."""
+    writer = ParquetWriter(output) if output.endswith(".parquet") else NpzWriter(output)
+    n_runs = 0
+    try:
+        for columns in run_blocks(params, trajectories, processes, chunk_runs):
+            writer.write(columns)
+            n_runs += columns["a_0"].size
+    finally:
+        writer.close()
+    return n_runs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run batches of gradient descent simulations without the app")
+    parser.add_argument("parameters", help="JSON parameter file")
+    parser.add_argument("--output", required=True, help="a .parquet file, or a directory for .npz chunks")
+    parser.add_argument("--trajectories", action="store_true", help="also store every iterate and loss")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-runs", type=int, default=CHUNK_RUNS)
+    args = parser.parse_args()
+    n_runs = simulate(read_parameters(args.parameters), args.output, args.trajectories, args.processes, args.chunk_runs)
+    print(f"{n_runs} runs written to {args.output}")
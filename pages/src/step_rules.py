@@ -0,0 +1,159 @@
+import numpy as np
+from pages.src.objectives import GOAL_BAND
+
+
+# STEP RULES:
+# how to go from a_n to a_{n+1}. Every rule works on a whole array of runs at once (one a_n and one η per run)
+# and reports how many evaluations of f, ∇f or ∇²f it needed, so that rules can be compared fairly.
+# They are written for the 1D objectives of the catalogue.
+
+class StepRule:
+    """Plain gradient descent: a_{n+1} = a_n - η ∇f(a_n).
+    Subclasses override init_state (extra memory carried from one step to the next, e.g. a velocity) and step."""
+    name = "Gradient descent"
+
+    def init_state(self, a_0s):
+        return None
+
+    def step(self, objective, a_n, eta, state):
+        """Returns a_{n+1}, the new state and the number of evaluations used by each run"""
+        return a_n - eta * objective.grad_f(a_n), state, np.ones(np.shape(a_n), dtype=int)
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+class Momentum(StepRule):
+    """Heavy ball: v_{n+1} = β v_n - η ∇f(a_n), a_{n+1} = a_n + v_{n+1}"""
+    name = "Momentum"
+
+    def __init__(self, beta=0.9):
+        self.beta = beta
+
+    def init_state(self, a_0s):
+        return np.zeros(np.shape(a_0s))
+
+    def step(self, objective, a_n, eta, velocity):
+        velocity = self.beta * velocity - eta * objective.grad_f(a_n)
+        return a_n + velocity, velocity, np.ones(np.shape(a_n), dtype=int)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(beta={self.beta})"
+
+
+class Nesterov(Momentum):
+    """Nesterov's accelerated gradient: like Momentum, but the gradient is taken at the look-ahead point a_n + β v_n"""
+    name = "Nesterov"
+
+    def step(self, objective, a_n, eta, velocity):
+        velocity = self.beta * velocity - eta * objective.grad_f(a_n + self.beta * velocity)
+        return a_n + velocity, velocity, np.ones(np.shape(a_n), dtype=int)
+
+
+class Backtracking(StepRule):
+    """Armijo backtracking line search: start from a step η and shrink it by `shrink` until
+    f(a_n - t ∇f(a_n)) <= f(a_n) - c t ∇f(a_n)² (at most max_backtracks times)"""
+    name = "Backtracking"
+
+    def __init__(self, c=1e-4, shrink=0.5, max_backtracks=30):
+        self.c = c
+        self.shrink = shrink
+        self.max_backtracks = max_backtracks
+
+    def step(self, objective, a_n, eta, state):
+        grad = objective.grad_f(a_n)
+        f_a_n = objective.f(a_n)
+        t = np.broadcast_to(np.asarray(eta, dtype=float), np.shape(a_n)).copy()
+        evals = np.full(np.shape(a_n), 2, dtype=int)  # ∇f(a_n) and f(a_n)
+        # only the runs whose step is still too long keep backtracking
+        todo = np.ones(np.shape(a_n), dtype=bool)
+        for _ in range(self.max_backtracks):
+            evals += todo
+            todo &= ~(objective.f(a_n - t * grad) <= f_a_n - self.c * t * grad ** 2)
+            if not todo.any():
+                break
+            t = np.where(todo, t * self.shrink, t)
+        return a_n - t * grad, state, evals
+
+    def __repr__(self):
+        return f"{type(self).__name__}(c={self.c}, shrink={self.shrink})"
+
+
+class Newton(StepRule):
+    """Newton's method: a_{n+1} = a_n - ∇f(a_n) / ∇²f(a_n), the curvature sets the step size so η is not used.
+    Where the second derivative is not positive (concave parts, kinks) we fall back to a gradient step with η."""
+    name = "Newton"
+
+    def step(self, objective, a_n, eta, state):
+        grad = objective.grad_f(a_n)
+        hess = objective.hess_f(a_n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            a_n_1 = np.where(hess > 0, a_n - grad / hess, a_n - eta * grad)
+        return a_n_1, state, np.full(np.shape(a_n), 2, dtype=int)
+
+
+class ProximalGradient(StepRule):
+    """Proximal gradient, for non-smooth objectives split into f = g + h (see objectives.nonsmooth):
+    a_{n+1} = prox_{ηh}(a_n - η ∇g(a_n)). On |x| the prox is soft-thresholding, which lands exactly on 0 instead of
+    jumping over it. On smooth objectives (no prox) it is plain gradient descent."""
+    name = "Proximal gradient"
+
+    def step(self, objective, a_n, eta, state):
+        a_n_1 = a_n - eta * objective.smooth_grad_f(a_n)
+        if objective.prox is not None:
+            a_n_1 = objective.prox(a_n_1, eta)
+        return a_n_1, state, np.ones(np.shape(a_n), dtype=int)
+
+
+class Subgradient(StepRule):
+    """Subgradient method with diminishing steps: a_{n+1} = a_n - η / (n + 1) g_n, g_n being ∇f(a_n) where f is
+    differentiable (sign(x) for |x|). The steps add up to infinity but shrink to 0, so a run can't bounce around a
+    kink forever. The state is the number of steps taken by each run."""
+    name = "Subgradient"
+
+    def init_state(self, a_0s):
+        return np.zeros(np.shape(a_0s))
+
+    def step(self, objective, a_n, eta, n):
+        return a_n - eta / (n + 1) * objective.grad_f(a_n), n + 1, np.ones(np.shape(a_n), dtype=int)
+
+
+all_step_rules = [StepRule(), Momentum(), Nesterov(), Backtracking(), Newton(), ProximalGradient(), Subgradient()]
+
+
+def run_step_rule(objective, step_rule, a0s, etas, max_iter):
+    """Vectorized runs of a step rule for many (a₀, η) pairs (broadcast against each other, see gradient_descent_batch).
+    Returns (n_runs, max_iter) arrays of iterates, losses and cumulated number of evaluations."""
+    a0s, etas = np.broadcast_arrays(np.asarray(a0s, dtype=float), np.asarray(etas, dtype=float))
+    a0s, etas = a0s.ravel(), etas.ravel()
+
+    a_ns = np.empty((a0s.size, max_iter))
+    evals = np.zeros((a0s.size, max_iter), dtype=int)
+    a_ns[:, 0] = a0s
+    state = step_rule.init_state(a0s)
+    with np.errstate(over='ignore', invalid='ignore'):
+        for i in range(1, max_iter):
+            a_ns[:, i], state, n_evals = step_rule.step(objective, a_ns[:, i-1], etas, state)
+            evals[:, i] = evals[:, i-1] + n_evals
+        losses = np.abs(objective.f(a_ns) - objective.f_min)
+
+    return a_ns, losses, evals
+
+
+def compare_step_rules(objective, a_0, eta, max_iter, step_rules=None):
+    """Run every step rule from the same a₀ with the same η and measure how fast each one gets down:
+    the iteration at which the loss first enters the goal band and the evaluations of f, ∇f, ∇²f this took
+    (NaN when the band is never reached within max_iter). Returns a DataFrame, pandas is only needed here."""
+    import pandas as pd
+    step_rules = all_step_rules if step_rules is None else step_rules
+    rows = []
+    for step_rule in step_rules:
+        a_ns, losses, evals = run_step_rule(objective, step_rule, a_0, eta, max_iter)
+        in_band = np.flatnonzero(losses[0] <= GOAL_BAND)
+        reached = in_band.size > 0
+        rows.append({'step_rule': step_rule.name,
+                     'iterations_to_band': in_band[0] if reached else np.nan,
+                     'evaluations_to_band': evals[0, in_band[0]] if reached else np.nan,
+                     'final_loss': losses[0, -1],
+                     'total_evaluations': evals[0, -1]})
+    return pd.DataFrame(rows)
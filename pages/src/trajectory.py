@@ -0,0 +1,99 @@
+import numpy as np
+
+
+class Trajectory:
+    """Record of one run of the algorithm: the iterates a_n, f(a_n) and the losses as contiguous float64 arrays,
+    the n-th entry of each being iteration n. Iterates are scalars (shape (n,)) or vectors (shape (n, d)).
+    Slicing (or prefix) returns views on the same arrays, so nothing is copied per row or per frame."""
+    __slots__ = ("a_ns", "f_a_ns", "losses", "_buffers")
+
+    def __init__(self, a_ns, f_a_ns, losses):
+        self.a_ns = np.asarray(a_ns, dtype=np.float64)
+        self.f_a_ns = np.asarray(f_a_ns, dtype=np.float64)
+        self.losses = np.asarray(losses, dtype=np.float64)
+        self._buffers = None # spare room for extend: (a_ns, f_a_ns, losses, [number of rows in use])
+
+    def __len__(self):
+        return self.a_ns.shape[0]
+
+    def __getitem__(self, index):
+        assert isinstance(index, slice), "Trajectories can only be sliced, use the arrays for single iterations"
+        return Trajectory(self.a_ns[index], self.f_a_ns[index], self.losses[index])
+
+    def __repr__(self):
+        return f"Trajectory({len(self)} iterations)"
+
+    @property
+    def iterations(self):
+        return np.arange(len(self))
+
+    def prefix(self, n):
+        """The first n iterations (a view)"""
+        return self[:n]
+
+    def extend(self, a_ns, f_a_ns, losses):
+        """This trajectory followed by more iterations, e.g. when a run is continued (see GradientDescent.continue_descent).
+        The arrays are views on buffers with spare room, doubled when full, so that extending a run many times only
+        costs the new iterations (amortized). The trajectory itself is left as it is."""
+        n, k = len(self), len(a_ns)
+        old = (self.a_ns, self.f_a_ns, self.losses)
+        buffers = self._buffers
+        # our buffers can be reused if they have room left and nobody else has written past our end
+        if buffers is None or buffers[3][0] != n or buffers[0].shape[0] < n + k:
+            capacity = max(2 * (n + k), 16)
+            buffers = tuple(np.empty((capacity,) + array.shape[1:]) for array in old) + (np.array([n]),)
+            for buffer, array in zip(buffers, old):
+                buffer[:n] = array
+        for buffer, array in zip(buffers, (a_ns, f_a_ns, losses)):
+            buffer[n:n + k] = array
+        buffers[3][0] = n + k
+        extended = Trajectory(*(buffer[:n + k] for buffer in buffers[:3]))
+        extended._buffers = buffers
+        return extended
+
+    def max_finite_loss(self):
+        """Largest loss that can actually be drawn (diverging runs contain inf/nan)"""
+        losses = self.losses[np.isfinite(self.losses)]
+        return float(losses.max()) if losses.size else 0.
+
+    def save(self, path):
+        """Store the run in a .npz file"""
+        np.savez(path, a_ns=self.a_ns, f_a_ns=self.f_a_ns, losses=self.losses)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(arrays["a_ns"], arrays["f_a_ns"], arrays["losses"])
+
+    def to_pandas(self):
+        """Export as a DataFrame with one row per iteration (pandas is only needed here)"""
+        import pandas as pd
+        if self.a_ns.ndim == 1:
+            columns = {'a_ns': self.a_ns}
+        else:
+            columns = {f'a_ns_{axis}': self.a_ns[:, k] for k, axis in enumerate("xyz"[:self.a_ns.shape[1]])}
+        return pd.DataFrame({**columns, 'f_a_ns': self.f_a_ns, 'losses': self.losses, 'iteration': self.iterations})
+
+
+class Checkpoint:
+    """Everything needed to continue a run later (see GradientDescent.checkpoint and GradientDescent.resume):
+    the function, the settings, the trajectory so far and the state of the step rule after its last iterate
+    (e.g. the velocity of Momentum). It is small enough to be kept in the session between two reruns."""
+    __slots__ = ("objective", "f_idx", "a_0", "eta", "step_rule", "loss_reference", "trajectory", "state", "stop_reason")
+
+    def __init__(self, objective, f_idx, a_0, eta, step_rule, loss_reference, trajectory, state, stop_reason):
+        self.objective = objective
+        self.f_idx = f_idx
+        self.a_0 = a_0
+        self.eta = eta
+        self.step_rule = step_rule
+        self.loss_reference = loss_reference
+        self.trajectory = trajectory
+        self.state = state
+        self.stop_reason = stop_reason
+
+    def __len__(self):
+        return len(self.trajectory)
+
+    def __repr__(self):
+        return f"Checkpoint({self.objective.name!r}, a_0={self.a_0}, eta={self.eta}, {len(self)} iterations)"
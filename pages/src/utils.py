@@ -73,8 +73,8 @@ def save_prediction_and_clear_text(user_text):
     if "answers" not in st.session_state:
         st.session_state.answers = {}
     
-    # Save current prediction to session_state
-    st.session_state["answers"][st.session_state.simulation_counter] = user_text
+    # Save current prediction to session_state, the simulation diagnostics are added next to it once it has run
+    st.session_state["answers"][st.session_state.simulation_counter] = {"prediction": user_text}
     
     #Additionnally save the user data to supabase
     save_user_data_to_supabase(init_supabase(), verbose=False)
@@ -83,6 +83,18 @@ def save_prediction_and_clear_text(user_text):
     st.session_state["user_prediction"] = ""
 
 
+def save_simulation_diagnostics(GD, simulation=None):
+    """Store the settings and the diagnostics of the simulation that was just run next to the student's prediction,
+    so that the analysis doesn't have to re-simulate it. It is sent to supabase with the next save of the user data.
+    simulation is the number of the simulation the run belongs to (the current one by default)."""
+    if "answers" not in st.session_state:
+        st.session_state.answers = {}
+    if simulation is None:
+        simulation = st.session_state.simulation_counter
+    answer = st.session_state["answers"].setdefault(simulation, {})
+    answer.update({"function": GD.objective.name, "a_0": GD.a_0, "eta": float(GD.eta), "diagnostics": GD.diagnostics})
+
+
 @st.cache_resource
 def init_supabase(disabled=True):
     if disabled: